@@ -53,6 +53,9 @@ if __name__ == '__main__':
     elif arg == 'reset.database':
         from lib import settings
         settings.removeContentDatabase()
+    elif arg == 'database.maintain':
+        from lib import settings
+        settings.maintainDatabase()
     elif arg == 'trailer.scrapers':
         from lib import settings
         settings.setScrapers()
@@ -62,6 +65,9 @@ if __name__ == '__main__':
     elif arg == 'install.contextMenu':
         from lib import settings
         settings.installContextMenu()
+    elif arg == 'profile.startup':
+        from lib import settings
+        settings.profileStartup()
     elif str(arg).startswith('sequence.'):
         from lib import settings
         settings.setDefaultSequence(arg)
@@ -1,9 +1,40 @@
 import os
 import sys
+import time
 import util
 import threading
 import traceback
 
+HTTP_POOL_SIZE = 10
+HTTP_TIMEOUT = 30  # Seconds. Override per command with a TIMEOUT: line
+
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+# path: (mtime, fileExists, [(protocol, data, args), ...], parserLog)
+_PARSE_CACHE = {}
+
+
+# One session for all HTTP actions so connections to each host are kept alive and reused
+def getHTTPSession():
+    global _SESSION
+    with _SESSION_LOCK:
+        if not _SESSION:
+            import requests
+            _SESSION = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            _SESSION.mount('http://', adapter)
+            _SESSION.mount('https://', adapter)
+        return _SESSION
+
+
+def closeHTTPSession():
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION:
+            _SESSION.close()
+            _SESSION = None
+
 
 class ActionCommand:
     type = None
@@ -21,9 +52,9 @@ class ActionCommand:
     def _absolutizeCommand(self):
         return os.path.normpath(os.path.join(os.path.dirname(self.path), self.commandData))
 
-    def join(self):
+    def join(self, timeout=None):
         if self.thread:
-            self.thread.join()
+            self.thread.join(timeout)
 
     def setPath(self, path):
         self.path = path
@@ -222,12 +253,13 @@ class HTTPCommand(ActionCommand):
         ActionCommand.__init__(self, data)
 
     def execute(self):
-        import requests
         import json
 
+        session = getHTTPSession()
         headers = None
         method = None
         data = None
+        timeout = HTTP_TIMEOUT
         args = list(self.args)
 
         HTTPCommand.commandID += 1
@@ -239,25 +271,30 @@ class HTTPCommand(ActionCommand):
             arg = args.pop()
             if arg.startswith('PUT:'):
                 data = arg[4:].lstrip()
-                method = requests.put
+                method = session.put
             elif arg.startswith('DELETE:'):
-                method = requests.delete
+                method = session.delete
             elif arg.startswith('HEADERS:'):
                 headers = json.loads(arg[8:].lstrip())
+            elif arg.startswith('TIMEOUT:'):
+                timeout = float(arg[8:].strip())
             else:
                 if arg.startswith('POST:'):
                     data = arg[5:].lstrip()
-                    method = requests.post
+                    method = session.post
                 else:
                     data = arg
-                    method = method or requests.post
+                    method = method or session.post
 
+        start = time.time()
         if method:
-            resp = method(self.commandData, headers=headers, data=data)
+            resp = method(self.commandData, headers=headers, data=data, timeout=timeout)
         else:
-            resp = requests.get(self.commandData, headers=headers)
+            resp = session.get(self.commandData, headers=headers, timeout=timeout)
 
-        self.log('Action (HTTP) [{0}] Response: {1}'.format(commandID, repr(resp.text).lstrip('u').strip("'")))
+        self.log('Action (HTTP) [{0}] Response ({1}, {2:.0f}ms): {3}'.format(
+            commandID, resp.status_code, (time.time() - start) * 1000, repr(resp.text).lstrip('u').strip("'"))
+        )
 
 
 class HTTPSCommand(HTTPCommand):
@@ -266,6 +303,26 @@ class HTTPSCommand(HTTPCommand):
         ActionCommand.__init__(self, data)
 
 
+# Waits for every action started before it to finish (or for the optional timeout in milliseconds).
+# Actions between two wait:// lines run in parallel as a group.
+class WaitCommand(ActionCommand):
+    type = 'WAIT'
+
+    def wait(self, started):
+        try:
+            timeout = self.commandData and int(self.commandData) / 1000.0 or None
+        except ValueError:
+            util.ERROR()
+            timeout = None
+
+        start = time.time()
+        end = timeout and start + timeout
+        for c in started:
+            c.join(end and max(end - time.time(), 0))
+
+        self.log('Action (Wait) Done: {0} action(s) in {1:.0f}ms'.format(len(started), (time.time() - start) * 1000))
+
+
 class ActionFileProcessor:
     commandClasses = {
         'http': HTTPCommand,
@@ -275,7 +332,8 @@ class ActionFileProcessor:
         'addon': AddonCommand,
         'module': ModuleCommand,
         'command': CommandCommand,
-        'sleep': SleepCommand
+        'sleep': SleepCommand,
+        'wait': WaitCommand
     }
 
     def __init__(self, path, test=False):
@@ -308,10 +366,35 @@ class ActionFileProcessor:
 
     def init(self):
         try:
-            self._loadCommands()
+            mtime = util.mtime(self.path)
+            cached = _PARSE_CACHE.get(self.path)
+            if cached and cached[0] == mtime:
+                self._loadCached(*cached[1:])
+                return
+
+            specs = []
+            self._loadCommands(specs)
+            _PARSE_CACHE[self.path] = (mtime, self.fileExists, specs, list(self.parserLog))
         except:
             util.ERROR()
 
+    def _loadCached(self, fileExists, specs, parserLog):
+        self.fileExists = fileExists
+        self.parserLog = list(parserLog)
+        if not self._test:
+            for type_, msg in parserLog:
+                util.DEBUG_LOG('    -| {0}'.format(msg))
+
+        for name, data, args in specs:
+            self.commands.append(self._createCommand(name, data, args))
+
+    def _createCommand(self, name, data, args):
+        command = self.commandClasses[name](data)
+        command.setPath(self.path)
+        for arg in args:
+            command.addArg(arg)
+        return command
+
     def readFile(self):
         if util.vfs.exists(self.path):
             self.fileExists = True
@@ -324,16 +407,24 @@ class ActionFileProcessor:
     def run(self):
         threading.Thread(target=self._run).start()
 
-    def _run(self):
+    def _run(self, test=False):
+        started = []
         for c in self.commands:
-            c._threadedExecute()
+            if isinstance(c, WaitCommand):
+                c.wait(started)
+                started = []
+            else:
+                if test:
+                    c._test()
+                else:
+                    c._threadedExecute()
+                started.append(c)
 
     def _testRun(self):
         self.setCVRunning()
 
         try:
-            for c in self.commands:
-                c._test()
+            self._run(test=True)
         finally:
             self.setCVRunning(False)
 
@@ -351,12 +442,13 @@ class ActionFileProcessor:
             line = line[1:]
         return line
 
-    def _loadCommands(self):
+    # Parsed commands are added to specs as (protocol, data, args) so they can be cached and rebuilt
+    def _loadCommands(self, specs):
         data = self.readFile()
         if not data:
             return
 
-        command = None
+        spec = None
         lineno = 0
         for line in data.splitlines():
             lineno += 1
@@ -364,7 +456,7 @@ class ActionFileProcessor:
                 if line.startswith('#'):
                     continue
 
-                if command:
+                if spec:
                     try:
                         name, data = line.split('://', 1)
                         if name in self.commandClasses:
@@ -377,7 +469,7 @@ class ActionFileProcessor:
                     except ValueError:
                         pass
 
-                    command.addArg(self._prepareLine(line))
+                    spec[2].append(self._prepareLine(line))
                 else:
                     try:
                         name, data = self._prepareLine(line).split('://', 1)
@@ -386,15 +478,18 @@ class ActionFileProcessor:
                         return
 
                     if name in self.commandClasses:
-                        command = self.commandClasses[name](data)
-                        command.setPath(self.path)
+                        spec = (name, data, [])
                     else:
                         self.parseError(u'Unrecognized command protocol: {0}'.format(repr(name)), line, lineno)
                         return
             else:
-                if command:
-                    self.commands.append(command)
-                command = None
+                if spec:
+                    self._addSpec(specs, spec)
+                spec = None
+
+        if spec:
+            self._addSpec(specs, spec)
 
-        if command:
-            self.commands.append(command)
+    def _addSpec(self, specs, spec):
+        specs.append(spec)
+        self.commands.append(self._createCommand(*spec))
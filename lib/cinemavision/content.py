@@ -1,10 +1,9 @@
 import os
 import re
+import collections
 from xml.etree import ElementTree as ET
 
 import util
-import mutagen
-import hachoir
 import database as DB
 import datetime
 
@@ -13,8 +12,6 @@ try:
 except:
     ET.ParseError = Exception
 
-mutagen.setFileOpener(util.vfs.File)
-
 TYPE_IDS = {
     '3D Intro': '3D.intro',
     '3D Outro': '3D.outro',
@@ -45,6 +42,108 @@ def getBumperDir(ID):
     return ('Video Bumpers', dirname)
 
 
+# Metadata readers, run inline or on MetadataPool workers. They must not touch the database.
+def songInfo(path):
+    mutagen = util.importMutagen()
+
+    try:
+        data = mutagen.FileByExtension(path, info_only=True)
+    except:
+        util.ERROR()
+        return None
+
+    return data and (data.info.length, data.info.pprint()) or None
+
+
+def videoDuration(path):
+    util.importMutagen()  # hachoir opens files through mutagen's opener
+    import hachoir
+
+    parser = hachoir.hachoir_parser.createParser(path)
+    metadata = hachoir.hachoir_metadata.extractMetadata(parser, keys=('duration',))
+    if not metadata:
+        return None
+    return metadata.get('duration')
+
+
+# Reads metadata for new files on worker processes, or threads where processes can't be used (Kodi).
+# Results are handed back to the importing thread in submission order, so the database writes
+# happen there, inside the handler's session. Waiting for results checks the progress callback
+# and a cancel terminates the workers. After a cancel submit() refuses new files and returns False.
+class MetadataPool:
+    QUEUE_PER_WORKER = 4  # Results waiting to be collected before submit() blocks
+
+    def __init__(self, workers, callback=None):
+        self.workers = workers
+        self._callback = callback
+        self._pool = None
+        self._pending = collections.deque()
+        self.cancelled = False
+        self.skipped = 0
+
+    def _start(self):
+        if util.MULTIPROCESSING:
+            import multiprocessing
+            self._pool = multiprocessing.Pool(self.workers)
+        else:
+            from multiprocessing.pool import ThreadPool
+            self._pool = ThreadPool(self.workers)
+
+        util.DEBUG_LOG('Metadata pool: Started {0} {1}'.format(self.workers, util.MULTIPROCESSING and 'processes' or 'threads'))
+
+    def submit(self, func, path, done):
+        if self.cancelled:
+            if not self.skipped:
+                util.LOG('Metadata pool: Import cancelled - skipping remaining new files')
+            self.skipped += 1
+            return False
+
+        if not self._pool:
+            self._start()
+
+        self._pending.append((self._pool.apply_async(func, (path,)), done))
+        self._collect(self.workers * self.QUEUE_PER_WORKER)
+        return True
+
+    def _collect(self, limit):
+        while self._pending:
+            result, done = self._pending[0]
+            if not result.ready():
+                if len(self._pending) <= limit:
+                    return
+
+                result.wait(0.25)
+                if not result.ready():
+                    if self._callback and not self._callback():
+                        self.cancel()
+                    continue
+
+            self._pending.popleft()
+            done(result.get())
+
+    # Waits for all submitted results. Returns False if the import was cancelled.
+    def finish(self):
+        self._collect(0)
+        return not self.cancelled
+
+    def cancel(self):
+        util.DEBUG_LOG('Metadata pool: Cancelled with {0} files pending'.format(len(self._pending)))
+        self.cancelled = True
+        self._pending.clear()
+        if self._pool:
+            self._pool.terminate()
+            self._pool = None
+
+    def close(self):
+        if self.skipped:
+            util.LOG('Metadata pool: {0} new files skipped after cancel'.format(self.skipped))
+
+        if self._pool:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+
 class UserContent:
     _tree = (
         ('Audio Format Bumpers', (
@@ -90,22 +189,38 @@ class UserContent:
         ))
     )
 
-    def __init__(self, content_dir=None, callback=None, db_path=None, trailer_sources=None):
+    def __init__(self, content_dir=None, callback=None, db_path=None, trailer_sources=None, workers=0):
         self._callback = callback
         self._trailer_sources = trailer_sources or []
+        self.metadataPool = workers > 0 and MetadataPool(workers, callback) or None
         self.setupDB(db_path)
         self.musicHandler = MusicHandler(self)
-        self.triviaDirectoryHandler = TriviaDirectoryHandler(self.log)
+        self.triviaDirectoryHandler = TriviaDirectoryHandler(self.log, self.metadataPool)
         self.setContentDirectoryPath(content_dir)
         if not db_path:
             self.setupContentDirectory()
 
+        dbStats = DB.stats()
         self.clean()
-        self.loadContent()
+        try:
+            self.loadContent()
+        finally:
+            if self.metadataPool:
+                self.metadataPool.close()
+
+        self.maintainDB(dbStats)
 
     def setupDB(self, db_path):
         DB.initialize(db_path, self.dbCallback)
 
+    def maintainDB(self, before):
+        if not DB.needsMaintenance(before):
+            return
+
+        self.logHeading('DATABASE MAINTENANCE')
+        for line in DB.maintenanceReport(DB.maintain(self.log)):
+            self.log(line)
+
     def dbCallback(self, msg=None, heading=None):
         util.DEBUG_LOG(msg or heading)
         if self._callback:
@@ -199,13 +314,15 @@ class UserContent:
 
         return cleaned
 
+    def cancelled(self):
+        return bool(self.metadataPool and self.metadataPool.cancelled)
+
     def loadContent(self):
-        self.loadMusic()
-        self.loadTrivia()
-        self.loadAudioFormatBumpers()
-        self.loadVideoBumpers()
-        self.loadRatingsBumpers()
-        self.scrapeContent()
+        for load in (self.loadMusic, self.loadTrivia, self.loadAudioFormatBumpers, self.loadVideoBumpers, self.loadRatingsBumpers, self.scrapeContent):
+            if self.cancelled():
+                self.log('Content loading cancelled - the import is incomplete')
+                return
+            load()
 
     def loadMusic(self):
         self.logHeading('LOADING MUSIC')
@@ -377,12 +494,12 @@ class UserContent:
 
                     for t in trailers:
                         allct += 1
-                        try:
-                            dt = DB.Trailers.get(DB.Trailers.WID == t.ID)
+                        dt = DB.getTrailer(t.ID)
+                        if dt:
                             dt.verified = True
                             dt.watched = t.watched or dt.watched
                             dt.save()
-                        except DB.peewee.DoesNotExist:
+                        else:
                             ct += 1
                             url = t.getStaticURL()
                             DB.Trailers.create(
@@ -432,10 +549,13 @@ class MusicHandler:
         total = float(len(names))
         for ct, file in enumerate(names):
             pct = int((ct / total) * 20)
-            if not self.owner._callback(pct=pct):
+            if not self.owner._callback(pct=pct) or self.owner.cancelled():
                 break
             self.addSongs(basePath, file)
 
+        if self.owner.metadataPool and not self.owner.metadataPool.finish():
+            self.owner.log('Loading music cancelled')
+
     def addSongs(self, base, file, sub=None):
         path = util.pathJoin(base, file)
 
@@ -443,6 +563,8 @@ class MusicHandler:
             paths = util.vfs.listdir(path)
             sub = sub and (sub + ':' + file) or file
             for p in paths:
+                if self.owner.cancelled():
+                    break
                 self.addSongs(path, p, sub)
             return
 
@@ -451,26 +573,25 @@ class MusicHandler:
             if sub:
                 name = sub + ':' + name
 
-            try:
-                DB.Song.get(DB.Song.path == path)
+            if DB.songExists(path):
                 self.owner.log('Loading Song (exists): [ {0} ]'.format(util.strRepr(name)))
-            except DB.peewee.DoesNotExist:
-                data = None
-                try:
-                    data = mutagen.File(path)
-                except:
-                    util.ERROR()
-
-                if data:
-                    duration = data.info.length
-                    self.owner.log('Loading Song (new): [ {0} ({1}) ]'.format(util.strRepr(name), data.info.pprint()))
+            else:
+                if self.owner.metadataPool:
+                    self.owner.metadataPool.submit(songInfo, path, lambda info: self.createSong(path, name, info))
                 else:
-                    duration = 0
-                DB.Song.create(
-                    path=path,
-                    name=name,
-                    duration=duration
-                )
+                    self.createSong(path, name, songInfo(path))
+
+    def createSong(self, path, name, info):
+        if info:
+            duration, pprint = info
+            self.owner.log('Loading Song (new): [ {0} ({1}) ]'.format(util.strRepr(name), pprint))
+        else:
+            duration = 0
+        DB.Song.create(
+            path=path,
+            name=name,
+            duration=duration
+        )
 
     def clean(self, base):
         cleaned = False
@@ -496,12 +617,18 @@ class TriviaDirectoryHandler:
     _defaultCRegEx = '(?i)_c(\d)?\.(?:jpg|png|gif|bmp)'
     _defaultARegEx = '(?i)_a\.(?:jpg|png|gif|bmp)'
 
-    def __init__(self, callback=None):
+    def __init__(self, callback=None, metadataPool=None):
         self._callback = callback
+        self.metadataPool = metadataPool
+
+    def cancelled(self):
+        return bool(self.metadataPool and self.metadataPool.cancelled)
 
     @DB.session
     def __call__(self, basePath, prefix=None):
         self.doCall(basePath, prefix)
+        if self.metadataPool and not self.metadataPool.finish():
+            self._callback('Loading trivia cancelled')
 
     def doCall(self, basePath, prefix=None):
         hasSlidesXML = False
@@ -546,6 +673,9 @@ class TriviaDirectoryHandler:
         trivia = {}
 
         for c in contents:
+            if self.cancelled():
+                return
+
             path = util.pathJoin(basePath, c)
 
             if util.isDir(path):
@@ -632,26 +762,27 @@ class TriviaDirectoryHandler:
         pack = os.path.basename(path.rstrip('\\/'))
         contents = util.vfs.listdir(path)
         for c in contents:
+            if self.cancelled():
+                break
             self.getSlide(path, c, pack)
 
+        if self.metadataPool and not self.metadataPool.finish():
+            self._callback('Loading trivia cancelled')
+
     def getSlide(self, path, c, pack=''):
         name, ext = os.path.splitext(c)
         duration = 0
         path = util.pathJoin(path, c)
 
-        try:
-            DB.Trivia.get(DB.Trivia.answerPath == path)
+        if DB.triviaExists(path):
             self._callback('Loading Trivia (exists): [ {0} ]'.format(util.strRepr(name)))
-        except DB.peewee.DoesNotExist:
+        else:
             if ext.lower() in util.videoExtensions:
-                ttype = 'video'
-                parser = hachoir.hachoir_parser.createParser(path)
-                metadata = hachoir.hachoir_metadata.extractMetadata(parser)
-                durationDT = None
-                if metadata:
-                    durationDT = metadata.get('duration')
-                    duration = durationDT and util.datetimeTotalSeconds(durationDT) or 0
-                self._callback('Loading Trivia (video): [ {0} ({1}) ]'.format(util.strRepr(name), durationDT))
+                if self.metadataPool:
+                    self.metadataPool.submit(videoDuration, path, lambda durationDT: self.createVideoSlide(path, name, pack, durationDT))
+                else:
+                    self.createVideoSlide(path, name, pack, videoDuration(path))
+                return
 
             elif ext.lower() in util.imageExtensions:
                 ttype = 'fact'
@@ -659,15 +790,23 @@ class TriviaDirectoryHandler:
             else:
                 return
 
-            DB.Trivia.get_or_create(
-                answerPath=path,
-                defaults={
-                    'type': ttype,
-                    'TID': u'{0}:{1}'.format(pack, name),
-                    'name': name,
-                    'duration': duration
-                }
-            )
+            self.createSlide(path, name, pack, ttype, duration)
+
+    def createVideoSlide(self, path, name, pack, durationDT):
+        duration = durationDT and util.datetimeTotalSeconds(durationDT) or 0
+        self._callback('Loading Trivia (video): [ {0} ({1}) ]'.format(util.strRepr(name), durationDT))
+        self.createSlide(path, name, pack, 'video', duration)
+
+    def createSlide(self, path, name, pack, ttype, duration):
+        DB.Trivia.get_or_create(
+            answerPath=path,
+            defaults={
+                'type': ttype,
+                'TID': u'{0}:{1}'.format(pack, name),
+                'name': name,
+                'duration': duration
+            }
+        )
 
     def getNodeAttribute(self, node, sub_node_name, attr_name):
         subNode = node.find(sub_node_name)
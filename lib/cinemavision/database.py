@@ -35,6 +35,9 @@ Rating = None
 Trailers = None
 WatchedTrivia = None
 
+_INITIALIZED_PATH = None
+_LOOKUPS = {}
+
 
 def session(func):
     def inner(*args, **kwargs):
@@ -127,11 +130,27 @@ def migrateDB(DB, version):
 def checkDBVersion(DB):
     vm = DBVersion.get_or_create(id=1, defaults={'version': 0})[0]
     if vm.version < DATABASE_VERSION:
-        if migrateDB(DB, vm.version):
-            vm.update(version=DATABASE_VERSION).execute()
+        if not migrateDB(DB, vm.version):
+            return False
+        vm.update(version=DATABASE_VERSION).execute()
+    return True
+
+
+def schemaVersion(db):
+    return db.execute_sql('PRAGMA user_version').fetchone()[0]
+
+
+def setSchemaVersion(db):
+    db.execute_sql('PRAGMA user_version = {0}'.format(DATABASE_VERSION))
 
 
 def initialize(path=None, callback=None):
+    global _INITIALIZED_PATH
+
+    dbDir = path or util.STORAGE_PATH
+    if dbDir == _INITIALIZED_PATH:  # Already set up for this path in this process
+        return
+
     callback = callback or dummyCallback
 
     callback(None, 'Creating/updating database...')
@@ -152,7 +171,6 @@ def initialize(path=None, callback=None):
     ###########################################################################################
     # Version
     ###########################################################################################
-    dbDir = path or util.STORAGE_PATH
     if not util.vfs.exists(dbDir):
         util.vfs.mkdirs(dbDir)
 
@@ -160,20 +178,28 @@ def initialize(path=None, callback=None):
     dbExists = util.vfs.exists(dbPath)
 
     DB = peewee.SqliteDatabase(dbPath)
-    W_DB = peewee.SqliteDatabase(util.pathJoin(path or util.STORAGE_PATH, 'watched.db'))
+    W_DB = peewee.SqliteDatabase(util.pathJoin(dbDir, 'watched.db'))
 
     DB.connect()
 
+    # Both files get DATABASE_VERSION as their user_version once their tables are created and migrated,
+    # after that CREATE TABLE and the version check are skipped. Bump DATABASE_VERSION when models change.
+    createTables = schemaVersion(DB) < DATABASE_VERSION or schemaVersion(W_DB) < DATABASE_VERSION
+
     class DBVersion(peewee.Model):
         version = peewee.IntegerField(default=0)
 
         class Meta:
             database = DB
 
-    DBVersion.create_table(fail_silently=True)
+    migrated = True
+    if createTables:
+        DBVersion.create_table(fail_silently=True)
 
-    if dbExists:  # Only check version if we had a DB, otherwise we're creating it fresh
-        checkDBVersion(DB)
+        if dbExists:  # Only check version if we had a DB, otherwise we're creating it fresh
+            migrated = checkDBVersion(DB)
+        else:
+            DBVersion.get_or_create(id=1, defaults={'version': DATABASE_VERSION})
 
     ###########################################################################################
     # Content
@@ -196,7 +222,8 @@ def initialize(path=None, callback=None):
         path = peewee.CharField(unique=True)
         duration = peewee.FloatField(default=0)
 
-    Song.create_table(fail_silently=True)
+    if createTables:
+        Song.create_table(fail_silently=True)
 
     callback(' - Tivia')
 
@@ -223,7 +250,8 @@ def initialize(path=None, callback=None):
         cluePath9 = peewee.CharField(unique=True, null=True)
         answerPath = peewee.CharField(unique=True, null=True)
 
-    Trivia.create_table(fail_silently=True)
+    if createTables:
+        Trivia.create_table(fail_silently=True)
 
     callback(' - AudioFormatBumpers')
 
@@ -235,7 +263,8 @@ def initialize(path=None, callback=None):
     class AudioFormatBumpers(BumperBase):
         format = peewee.CharField()
 
-    AudioFormatBumpers.create_table(fail_silently=True)
+    if createTables:
+        AudioFormatBumpers.create_table(fail_silently=True)
 
     callback(' - RatingsBumpers')
 
@@ -243,7 +272,8 @@ def initialize(path=None, callback=None):
         system = peewee.CharField(default='MPAA')
         style = peewee.CharField(default='Classic')
 
-    RatingsBumpers.create_table(fail_silently=True)
+    if createTables:
+        RatingsBumpers.create_table(fail_silently=True)
 
     callback(' - VideoBumpers')
 
@@ -254,7 +284,8 @@ def initialize(path=None, callback=None):
         genre = peewee.CharField(null=True)
         year = peewee.CharField(null=True)
 
-    VideoBumpers.create_table(fail_silently=True)
+    if createTables:
+        VideoBumpers.create_table(fail_silently=True)
 
     ###########################################################################################
     # Ratings
@@ -268,7 +299,8 @@ def initialize(path=None, callback=None):
         class Meta:
             database = DB
 
-    RatingSystem.create_table(fail_silently=True)
+    if createTables:
+        RatingSystem.create_table(fail_silently=True)
 
     class Rating(peewee.Model):
         name = peewee.CharField(unique=True)
@@ -279,7 +311,8 @@ def initialize(path=None, callback=None):
         class Meta:
             database = DB
 
-    Rating.create_table(fail_silently=True)
+    if createTables:
+        Rating.create_table(fail_silently=True)
 
     ###########################################################################################
     # Watched Database
@@ -305,17 +338,176 @@ def initialize(path=None, callback=None):
         is3D = peewee.BooleanField(default=False)
         verified = peewee.BooleanField(default=True)
 
-    Trailers.create_table(fail_silently=True)
+    if createTables:
+        Trailers.create_table(fail_silently=True)
 
     callback(' - Trailers')
 
     class WatchedTrivia(WatchedBase):
         pass
 
-    WatchedTrivia.create_table(fail_silently=True)
+    if createTables:
+        WatchedTrivia.create_table(fail_silently=True)
 
     callback(' - Trivia (watched status)')
 
+    if createTables and migrated:
+        setSchemaVersion(DB)
+        setSchemaVersion(W_DB)
+
     callback(None, 'Database created')
 
     DB.close()
+
+    _LOOKUPS.clear()
+    _INITIALIZED_PATH = dbDir
+
+
+###########################################################################################
+# Lookups
+###########################################################################################
+# Peewee builds and compiles a new query for every get(). The fixed per row lookups made while loading content
+# and choosing trivia are compiled once per initialize() and run on the cursor with the values bound.
+def _lookup(model, name, query, params):
+    key = (model.__name__, name)
+    sql = _LOOKUPS.get(key)
+    if not sql:
+        sql = _LOOKUPS[key] = query().sql()[0]
+    return model._meta.database.execute_sql(sql, params, require_commit=False).fetchone()
+
+
+def _exists(model, field, value):
+    query = lambda: model.select(peewee.SQL('1')).where(field == '').limit(1)
+    return _lookup(model, field.name + ':exists', query, (value,)) is not None
+
+
+def _get(model, field, value):
+    fields = model._meta.get_fields()
+    query = lambda: model.select(*fields).where(field == '').limit(1)
+    row = _lookup(model, field.name + ':get', query, (value,))
+    if row is None:
+        return None
+
+    instance = model()
+    for f, val in zip(fields, row):
+        setattr(instance, f.name, f.python_value(val))
+    instance._prepare_instance()
+    return instance
+
+
+def songExists(path):
+    return _exists(Song, Song.path, path)
+
+
+def triviaExists(answerPath):
+    return _exists(Trivia, Trivia.answerPath, answerPath)
+
+
+def triviaWatched(TID):
+    query = lambda: WatchedTrivia.select(peewee.SQL('1')).where((WatchedTrivia.WID == '') & WatchedTrivia.watched).limit(1)
+    return _lookup(WatchedTrivia, 'WID:watched', query, (TID,)) is not None
+
+
+def getTrivia(TID):
+    return _get(Trivia, Trivia.TID, TID)
+
+
+def trailerExists(WID):
+    return _exists(Trailers, Trailers.WID, WID)
+
+
+def getTrailer(WID):
+    return _get(Trailers, Trailers.WID, WID)
+
+
+###########################################################################################
+# Maintenance
+###########################################################################################
+MAINTAIN_CHANGED_ROWS = 500  # Content updates adding or removing this many rows are followed by maintain()
+MAINTAIN_FREE_RATIO = 0.25  # ...as are updates leaving this much of a file as free pages
+
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+def _pragma(db, name):
+    return db.execute_sql('PRAGMA {0}'.format(name)).fetchone()[0]
+
+
+def _stats(db):
+    tables = [r[0] for r in db.execute_sql("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+    return {
+        'pages': _pragma(db, 'page_count'),
+        'free': _pragma(db, 'freelist_count'),
+        'pageSize': _pragma(db, 'page_size'),
+        'rows': [(t, db.execute_sql('SELECT COUNT(*) FROM "{0}"'.format(t)).fetchone()[0]) for t in tables]
+    }
+
+
+def _databases():
+    return (('content.db', DB), ('watched.db', W_DB))
+
+
+def stats():
+    ret = []
+    for name, db in _databases():
+        db.connect()
+        try:
+            ret.append(_stats(db))
+        finally:
+            db.close()
+    return ret
+
+
+def needsMaintenance(before):
+    for old, new in zip(before, stats()):
+        oldRows = dict(old['rows'])
+        newRows = dict(new['rows'])
+        changed = sum(abs(newRows.get(t, 0) - oldRows.get(t, 0)) for t in set(oldRows) | set(newRows))
+        if changed >= MAINTAIN_CHANGED_ROWS or new['free'] > new['pages'] * MAINTAIN_FREE_RATIO:
+            return True
+    return False
+
+
+def maintain(callback=None):
+    callback = callback or dummyCallback
+
+    report = []
+    for name, db in _databases():
+        db.connect()
+        try:
+            before = _stats(db)
+
+            callback('{0}: Checking integrity...'.format(name))
+            integrity = [r[0] for r in db.execute_sql('PRAGMA integrity_check').fetchall()]
+            if integrity != ['ok']:
+                util.LOG('Database maintenance: {0} failed integrity check: {1}'.format(name, '; '.join(integrity)))
+                report.append((name, integrity, before, before))
+                continue
+
+            callback('{0}: Analyzing...'.format(name))
+            db.execute_sql('ANALYZE')
+
+            callback('{0}: Vacuuming...'.format(name))
+            if _pragma(db, 'auto_vacuum') == AUTO_VACUUM_INCREMENTAL:
+                db.execute_sql('PRAGMA incremental_vacuum').fetchall()  # Frees a page per step, so step to the end
+            else:
+                # The auto_vacuum mode only changes with a full VACUUM. After this, free pages are released incrementally.
+                db.execute_sql('PRAGMA auto_vacuum = INCREMENTAL')
+                db.execute_sql('VACUUM')
+
+            report.append((name, integrity, before, _stats(db)))
+        finally:
+            db.close()
+
+    return report
+
+
+def maintenanceReport(report):
+    lines = []
+    for name, integrity, before, after in report:
+        lines.append('{0}: integrity {1}'.format(name, '; '.join(integrity)))
+        lines.append('    Pages: {0} -> {1} ({2} bytes each)'.format(before['pages'], after['pages'], after['pageSize']))
+        lines.append('    Free pages: {0} -> {1}'.format(before['free'], after['free']))
+        for table, count in after['rows']:
+            lines.append('    {0}: {1} rows'.format(table, count))
+    return lines
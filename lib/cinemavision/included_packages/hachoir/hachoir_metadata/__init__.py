@@ -1,15 +1,6 @@
 from hachoir_metadata.version import VERSION as __version__
-from hachoir_metadata.metadata import extractMetadata
+from hachoir_metadata.metadata import extractMetadata, getExtractor
 
-# Just import the module,
-# each module use registerExtractor() method
-import hachoir_metadata.archive
-import hachoir_metadata.audio
-import hachoir_metadata.file_system
-import hachoir_metadata.image
-import hachoir_metadata.jpeg
-import hachoir_metadata.misc
-import hachoir_metadata.program
-import hachoir_metadata.riff
-import hachoir_metadata.video
+# Extractor modules (each one uses the registerExtractor() method) are
+# imported by getExtractor() on first use, see EXTRACTOR_MODULES
 
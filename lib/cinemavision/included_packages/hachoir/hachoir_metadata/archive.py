@@ -2,8 +2,12 @@ from hachoir_metadata.metadata_item import QUALITY_BEST, QUALITY_FASTEST
 from hachoir_metadata.safe import fault_tolerant, getValue
 from hachoir_metadata.metadata import (
     RootMetadata, Metadata, MultipleMetadata, registerExtractor)
-from hachoir_parser.archive import (Bzip2Parser, CabFile, GzipParser,
-    TarFile, ZipFile, MarFile)
+from hachoir_parser.archive.bzip2_parser import Bzip2Parser
+from hachoir_parser.archive.cab import CabFile
+from hachoir_parser.archive.gzip_parser import GzipParser
+from hachoir_parser.archive.tar import TarFile
+from hachoir_parser.archive.zip import ZipFile
+from hachoir_parser.archive.mar import MarFile
 from hachoir_core.tools import humanUnixAttributes
 from hachoir_core.i18n import _
 
@@ -1,7 +1,12 @@
 from hachoir_metadata.metadata import (registerExtractor,
     Metadata, RootMetadata, MultipleMetadata)
-from hachoir_parser.audio import AuFile, MpegAudioFile, RealAudioFile, AiffFile, FlacParser
-from hachoir_parser.container import OggFile, RealMediaFile
+from hachoir_parser.audio.au import AuFile
+from hachoir_parser.audio.mpeg_audio import MpegAudioFile
+from hachoir_parser.audio.real_audio import RealAudioFile
+from hachoir_parser.audio.aiff import AiffFile
+from hachoir_parser.audio.flac import FlacParser
+from hachoir_parser.container.ogg import OggFile
+from hachoir_parser.container.realmedia import RealMediaFile
 from hachoir_core.i18n import _
 from hachoir_core.tools import makePrintable, timedelta2seconds, humanBitRate
 from datetime import timedelta
@@ -12,21 +12,44 @@ from hachoir_metadata.register import registerAllItems
 
 extractors = {}
 
+# Module registering the extractor of the parsers of each parser package or
+# module. They are imported on first use, so that extracting metadata of a
+# video doesn't import the parsers of images, archives, etc.
+EXTRACTOR_MODULES = {
+    "hachoir_parser.archive": "hachoir_metadata.archive",
+    "hachoir_parser.audio": "hachoir_metadata.audio",
+    "hachoir_parser.container.mkv": "hachoir_metadata.video",
+    "hachoir_parser.container.ogg": "hachoir_metadata.audio",
+    "hachoir_parser.container.realmedia": "hachoir_metadata.audio",
+    "hachoir_parser.container.riff": "hachoir_metadata.riff",
+    "hachoir_parser.container.swf": "hachoir_metadata.misc",
+    "hachoir_parser.file_system": "hachoir_metadata.file_system",
+    "hachoir_parser.image": "hachoir_metadata.image",
+    "hachoir_parser.image.jpeg": "hachoir_metadata.jpeg",
+    "hachoir_parser.misc": "hachoir_metadata.misc",
+    "hachoir_parser.program": "hachoir_metadata.program",
+    "hachoir_parser.video": "hachoir_metadata.video",
+}
+
 class Metadata(Logger):
     header = u"Metadata"
 
-    def __init__(self, parent, quality=QUALITY_NORMAL):
+    def __init__(self, parent, quality=QUALITY_NORMAL, keys=None):
         assert isinstance(self.header, unicode)
 
         # Limit to 0.0 .. 1.0
         if parent:
             quality = parent.quality
+            keys = parent.requested
         else:
             quality = min(max(0.0, quality), 1.0)
+            if keys:
+                keys = frozenset(keys)
 
         object.__init__(self)
         object.__setattr__(self, "_Metadata__data", {})
         object.__setattr__(self, "quality", quality)
+        object.__setattr__(self, "requested", keys or None)
         header = self.__class__.header
         object.__setattr__(self, "_Metadata__header", header)
 
@@ -64,6 +87,25 @@ class Metadata(Logger):
     def has(self, key):
         return 1 <= len(self.getItems(key))
 
+    def wants(self, *keys):
+        """
+        Check if it is worth extracting any of the metadata 'keys': always
+        true if no keys were requested, otherwise true if one of them is
+        requested and still has no value.
+        """
+        if not self.requested:
+            return True
+        return any(key in self.requested and not self.has(key) for key in keys)
+
+    def done(self):
+        """
+        True if keys were requested and all of them have a value, extractors
+        stop reading fields at this point.
+        """
+        if not self.requested:
+            return False
+        return all(self.has(key) for key in self.requested)
+
     def get(self, key, default=None, index=0):
         """
         Read first value of tag with name 'key'.
@@ -201,13 +243,13 @@ class Metadata(Logger):
         return any(item for item in self.__data.itervalues())
 
 class RootMetadata(Metadata):
-    def __init__(self, quality=QUALITY_NORMAL):
-        Metadata.__init__(self, None, quality)
+    def __init__(self, quality=QUALITY_NORMAL, keys=None):
+        Metadata.__init__(self, None, quality, keys)
 
 class MultipleMetadata(RootMetadata):
     header = _("Common")
-    def __init__(self, quality=QUALITY_NORMAL):
-        RootMetadata.__init__(self, quality)
+    def __init__(self, quality=QUALITY_NORMAL, keys=None):
+        RootMetadata.__init__(self, quality, keys)
         object.__setattr__(self, "_MultipleMetadata__groups", Dict())
         object.__setattr__(self, "_MultipleMetadata__key_counter", {})
 
@@ -270,16 +312,33 @@ def registerExtractor(parser, extractor):
     assert issubclass(extractor, RootMetadata)
     extractors[parser] = extractor
 
-def extractMetadata(parser, quality=QUALITY_NORMAL):
+def getExtractor(parser_class):
+    """
+    Get the extractor of a parser class, importing the module registering it
+    if needed. Returns None if there is no extractor for the parser.
+    """
+    if parser_class not in extractors:
+        module = parser_class.__module__
+        while module and module not in EXTRACTOR_MODULES:
+            module = module.rpartition(".")[0]
+        if module:
+            __import__(EXTRACTOR_MODULES[module])
+    return extractors.get(parser_class)
+
+def extractMetadata(parser, quality=QUALITY_NORMAL, keys=None):
     """
     Create a Metadata class from a parser. Returns None if no metadata
     extractor does exist for the parser class.
+
+    keys is an optional list of the metadata keys the caller needs (ie.
+    ("duration",)). Extractors supporting it stop feeding fields once these
+    keys have a value and skip parts of the file only useful for other keys,
+    other metadata may then be missing.
     """
-    try:
-        extractor = extractors[parser.__class__]
-    except KeyError:
+    extractor = getExtractor(parser.__class__)
+    if extractor is None:
         return None
-    metadata = extractor(quality)
+    metadata = extractor(quality, keys)
     try:
         metadata.extract(parser)
     except HACHOIR_ERRORS as err:
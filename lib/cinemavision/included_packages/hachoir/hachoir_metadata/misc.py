@@ -1,7 +1,10 @@
 from hachoir_metadata.metadata import RootMetadata, registerExtractor
 from hachoir_metadata.safe import fault_tolerant
-from hachoir_parser.container import SwfFile
-from hachoir_parser.misc import TorrentFile, TrueTypeFontFile, OLE2_File, PcfFile
+from hachoir_parser.container.swf import SwfFile
+from hachoir_parser.misc.torrent import TorrentFile
+from hachoir_parser.misc.ttf import TrueTypeFontFile
+from hachoir_parser.misc.ole2 import OLE2_File
+from hachoir_parser.misc.pcf import PcfFile
 from hachoir_core.field import isString
 from hachoir_core.error import warning
 from hachoir_parser import guessParser
@@ -1,5 +1,5 @@
 from hachoir_metadata.metadata import RootMetadata, registerExtractor
-from hachoir_parser.program import ExeFile
+from hachoir_parser.program.exe import ExeFile
 from hachoir_metadata.safe import fault_tolerant, getValue
 
 class ExeMetadata(RootMetadata):
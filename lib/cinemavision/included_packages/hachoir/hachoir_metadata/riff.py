@@ -27,16 +27,20 @@ class RiffMetadata(MultipleMetadata):
         type = riff["type"].value
         if type == "WAVE":
             self.extractWAVE(riff)
-            size = getValue(riff, "audio_data/size")
-            if size:
-                computeAudioComprRate(self, size*8)
+            if self.wants("compr_rate"):
+                size = getValue(riff, "audio_data/size")
+                if size:
+                    computeAudioComprRate(self, size*8)
         elif type == "AVI ":
             if "headers" in riff:
                 self.extractAVI(riff["headers"])
-                self.extractInfo(riff["headers"])
+                if self.wants(*self.TAG_TO_KEY.values()):
+                    self.extractInfo(riff["headers"])
         elif type == "ACON":
             self.extractAnim(riff)
-        if "info" in riff:
+        # The info chunk may follow the movie data and the index, which
+        # feeds every top-level chunk (and the AVIX chunks of OpenDML files)
+        if self.wants(*self.TAG_TO_KEY.values()) and "info" in riff:
             self.extractInfo(riff["info"])
 
     def processChunk(self, chunk):
@@ -163,11 +167,12 @@ class RiffMetadata(MultipleMetadata):
             self.useAviHeader(headers["avi_hdr"])
 
         # Compute global bit rate
-        if self.has("duration") and "/movie/size" in headers:
+        if self.has("duration") and self.wants("bit_rate") \
+        and "/movie/size" in headers:
             self.bit_rate = float(headers["/movie/size"].value) * 8 / timedelta2seconds(self.get('duration'))
 
         # Video has index?
-        if "/index" in headers:
+        if self.wants("comment") and "/index" in headers:
             self.comment = _("Has audio/video index (%s)") \
                 % humanFilesize(headers["/index"].size/8)
 
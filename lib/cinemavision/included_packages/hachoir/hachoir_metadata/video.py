@@ -3,10 +3,11 @@ from hachoir_metadata.metadata import (registerExtractor,
     Metadata, RootMetadata, MultipleMetadata)
 from hachoir_metadata.metadata_item import QUALITY_GOOD
 from hachoir_metadata.safe import fault_tolerant
-from hachoir_parser.video import MovFile, AsfFile, FlvFile
+from hachoir_parser.video.mov import MovFile
+from hachoir_parser.video.asf import AsfFile
+from hachoir_parser.video.flv import FlvFile
 from hachoir_parser.video.asf import Descriptor as ASF_Descriptor
-from hachoir_parser.container import MkvFile
-from hachoir_parser.container.mkv import dateToDatetime
+from hachoir_parser.container.mkv import MkvFile, dateToDatetime
 from hachoir_core.i18n import _
 from hachoir_core.tools import makeUnicode, makePrintable, timedelta2seconds
 from datetime import timedelta
@@ -28,18 +29,26 @@ class MkvMetadata(MultipleMetadata):
     def extract(self, mkv):
         for segment in mkv.array("Segment"):
             self.processSegment(segment)
+            if self.done():
+                break
 
     def processSegment(self, segment):
         for field in segment:
+            if self.done():
+                return
             if field.name.startswith("Info["):
                 self.processInfo(field)
             elif field.name.startswith("Tags["):
-                for tag in field.array("Tag"):
-                    self.processTag(tag)
+                if self.wants(*self.tag_key.values()):
+                    for tag in field.array("Tag"):
+                        self.processTag(tag)
             elif field.name.startswith("Tracks["):
-                self.processTracks(field)
+                if not self.requested:
+                    self.processTracks(field)
             elif field.name.startswith("Cluster["):
-                if self.quality < QUALITY_GOOD:
+                # Tags may follow the clusters, but walking all of them
+                # is too slow for requested keys or normal quality
+                if self.quality < QUALITY_GOOD or self.requested:
                     return
 
     def processTracks(self, tracks):
@@ -149,14 +158,17 @@ class MkvMetadata(MultipleMetadata):
 
 class FlvMetadata(MultipleMetadata):
     def extract(self, flv):
-        if "video[0]" in flv:
-            meta = Metadata(self)
-            self.extractVideo(flv["video[0]"], meta)
-            self.addGroup("video", meta, "Video stream")
-        if "audio[0]" in flv:
-            meta = Metadata(self)
-            self.extractAudio(flv["audio[0]"], meta)
-            self.addGroup("audio", meta, "Audio stream")
+        # Stream groups are only read without requested keys: looking for
+        # a missing audio or video stream feeds every tag of the file
+        if not self.requested:
+            if "video[0]" in flv:
+                meta = Metadata(self)
+                self.extractVideo(flv["video[0]"], meta)
+                self.addGroup("video", meta, "Video stream")
+            if "audio[0]" in flv:
+                meta = Metadata(self)
+                self.extractAudio(flv["audio[0]"], meta)
+                self.addGroup("audio", meta, "Audio stream")
         # TODO: Computer duration
         # One technic: use last video/audio chunk and use timestamp
         # But this is very slow
@@ -164,7 +176,7 @@ class FlvMetadata(MultipleMetadata):
 
         if "metadata/entry[1]" in flv:
             self.extractAMF(flv["metadata/entry[1]"])
-        if self.has('duration'):
+        if self.has('duration') and self.wants('bit_rate'):
             self.bit_rate = flv.size / timedelta2seconds(self.get('duration'))
 
     @fault_tolerant
@@ -216,6 +228,9 @@ class MovMetadata(RootMetadata):
         for atom in mov:
             if "movie" in atom:
                 self.processMovie(atom["movie"])
+                # Skip media data and the fragments of fragmented files
+                if self.done():
+                    break
 
     @fault_tolerant
     def processMovieHeader(self, hdr):
@@ -240,8 +255,11 @@ class MovMetadata(RootMetadata):
 
     def processMovie(self, atom):
         for field in atom:
+            if self.done():
+                return
             if "track" in field:
-                self.processTrack(field["track"])
+                if self.wants("width", "height"):
+                    self.processTrack(field["track"])
             if "movie_hdr" in field:
                 self.processMovieHeader(field["movie_hdr"])
 
@@ -271,7 +289,8 @@ class AsfMetadata(MultipleMetadata):
         compression = []
         is_vbr = None
 
-        if "ext_desc/content" in header:
+        if "ext_desc/content" in header \
+        and self.wants("producer", "comment", *self.EXT_DESC_TO_ATTR.values()):
             # Extract all data from ext_desc
             data = {}
             for desc in header.array("ext_desc/content/descriptor"):
@@ -301,6 +320,8 @@ class AsfMetadata(MultipleMetadata):
 
         if "file_prop/content" in header:
             self.useFileProp(header["file_prop/content"], is_vbr)
+        if self.done():
+            return
 
         if "codec_list/content" in header:
             for codec in header.array("codec_list/content/codec"):
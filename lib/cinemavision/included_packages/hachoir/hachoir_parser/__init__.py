@@ -2,6 +2,7 @@ from hachoir_parser.version import __version__
 from hachoir_parser.parser import ValidateError, HachoirParser, Parser
 from hachoir_parser.parser_list import ParserList, HachoirParserList
 from hachoir_parser.guess import (QueryParser, guessParser, createParser)
-from hachoir_parser import (archive, audio, container,
-    file_system, image, game, misc, network, program, video)
+
+# Parser modules (archive, audio, container, file_system, image, game, misc,
+# network, program and video) are imported by HachoirParserList on first use
 
@@ -1,13 +1,15 @@
-from hachoir_parser.archive.ace import AceFile
-from hachoir_parser.archive.ar import ArchiveFile
-from hachoir_parser.archive.bzip2_parser import Bzip2Parser
-from hachoir_parser.archive.cab import CabFile
-from hachoir_parser.archive.gzip_parser import GzipParser
-from hachoir_parser.archive.tar import TarFile
-from hachoir_parser.archive.zip import ZipFile
-from hachoir_parser.archive.rar import RarFile
-from hachoir_parser.archive.rpm import RpmFile
-from hachoir_parser.archive.sevenzip import SevenZipParser
-from hachoir_parser.archive.mar import MarFile
-from hachoir_parser.archive.mozilla_ar import MozillaArchive
-from hachoir_parser.archive.zlib import ZlibData
+PARSERS = (
+    "ace.AceFile",
+    "ar.ArchiveFile",
+    "bzip2_parser.Bzip2Parser",
+    "cab.CabFile",
+    "gzip_parser.GzipParser",
+    "mar.MarFile",
+    "mozilla_ar.MozillaArchive",
+    "rar.RarFile",
+    "rpm.RpmFile",
+    "sevenzip.SevenZipParser",
+    "tar.TarFile",
+    "zip.ZipFile",
+    "zlib.ZlibData",
+)
@@ -1,12 +1,13 @@
-from hachoir_parser.audio.aiff import AiffFile
-from hachoir_parser.audio.au import AuFile
-from hachoir_parser.audio.itunesdb import ITunesDBFile
-from hachoir_parser.audio.midi import MidiFile
-from hachoir_parser.audio.mpeg_audio import MpegAudioFile
-from hachoir_parser.audio.real_audio import RealAudioFile
-from hachoir_parser.audio.xm import XMModule
-from hachoir_parser.audio.s3m import S3MModule
-from hachoir_parser.audio.s3m import PTMModule
-from hachoir_parser.audio.mod import AmigaModule
-from hachoir_parser.audio.flac import FlacParser
-
+PARSERS = (
+    "aiff.AiffFile",
+    "mod.AmigaModule",
+    "au.AuFile",
+    "flac.FlacParser",
+    "itunesdb.ITunesDBFile",
+    "midi.MidiFile",
+    "mpeg_audio.MpegAudioFile",
+    "s3m.PTMModule",
+    "real_audio.RealAudioFile",
+    "s3m.S3MModule",
+    "xm.XMModule",
+)
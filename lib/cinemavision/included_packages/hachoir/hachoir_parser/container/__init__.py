@@ -1,7 +1,9 @@
-from hachoir_parser.container.asn1 import ASN1File
-from hachoir_parser.container.mkv import MkvFile
-from hachoir_parser.container.ogg import OggFile, OggStream
-from hachoir_parser.container.riff import RiffFile
-from hachoir_parser.container.swf import SwfFile
-from hachoir_parser.container.realmedia import RealMediaFile
-
+PARSERS = (
+    "asn1.ASN1File",
+    "mkv.MkvFile",
+    "ogg.OggFile",
+    "ogg.OggStream",
+    "realmedia.RealMediaFile",
+    "riff.RiffFile",
+    "swf.SwfFile",
+)
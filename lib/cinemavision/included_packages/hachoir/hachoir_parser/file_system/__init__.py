@@ -1,8 +1,11 @@
-from hachoir_parser.file_system.ext2 import EXT2_FS
-from hachoir_parser.file_system.fat import FAT12, FAT16, FAT32
-from hachoir_parser.file_system.mbr import MSDos_HardDrive
-from hachoir_parser.file_system.ntfs import NTFS
-from hachoir_parser.file_system.iso9660 import ISO9660
-from hachoir_parser.file_system.reiser_fs import REISER_FS
-from hachoir_parser.file_system.linux_swap import LinuxSwapFile
-
+PARSERS = (
+    "ext2.EXT2_FS",
+    "fat.FAT12",
+    "fat.FAT16",
+    "fat.FAT32",
+    "iso9660.ISO9660",
+    "linux_swap.LinuxSwapFile",
+    "mbr.MSDos_HardDrive",
+    "ntfs.NTFS",
+    "reiser_fs.REISER_FS",
+)
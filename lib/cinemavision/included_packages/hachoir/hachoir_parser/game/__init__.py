@@ -1,4 +1,7 @@
-from hachoir_parser.game.zsnes import ZSNESFile
-from hachoir_parser.game.spider_man_video import SpiderManVideoFile
-from hachoir_parser.game.laf import LafFile
-from hachoir_parser.game.blp import BLP1File, BLP2File
\ No newline at end of file
+PARSERS = (
+    "blp.BLP1File",
+    "blp.BLP2File",
+    "laf.LafFile",
+    "spider_man_video.SpiderManVideoFile",
+    "zsnes.ZSNESFile",
+)
@@ -5,11 +5,88 @@ Parser list managment:
 
 import os
 from hachoir_core.error import warning, info, HACHOIR_ERRORS
+from hachoir_core.tools import makeUnicode
 from hachoir_parser import ValidateError, HachoirParserList
 from hachoir_core.stream import FileInputStream
 from hachoir_core.i18n import _
 import weakref
 
+# Parsers tried before building the parser list (which imports every parser
+# module): (module, class name, file extensions, magics). A magic is a
+# (bytes, address in bits) tuple found at the start of the file.
+FAST_PARSERS = (
+    ("hachoir_parser.video.mov", "MovFile",
+        ("mov", "qt", "mp4", "m4v", "m4a", "m4p", "m4b"),
+        (("ftyp", 4*8), ("moov", 4*8))),
+    ("hachoir_parser.container.mkv", "MkvFile",
+        ("mka", "mkv", "webm"),
+        (("\x1a\x45\xdf\xa3", 0),)),
+    ("hachoir_parser.container.riff", "RiffFile",
+        ("avi", "cda", "wav", "ani"),
+        (("AVI LIST", 8*8), ("WAVEfmt ", 8*8))),
+    ("hachoir_parser.video.asf", "AsfFile",
+        ("wmv", "wma", "asf"),
+        (("\x30\x26\xb2\x75\x8e\x66\xcf\x11\xa6\xd9\x00\xaa\x00\x62\xce\x6c", 0),)),
+    ("hachoir_parser.video.flv", "FlvFile",
+        ("flv",),
+        (("FLV\x01", 0),)),
+    ("hachoir_parser.video.mpeg_video", "MPEGVideoFile",
+        ("mpeg", "mpg", "mpe", "vob"),
+        (("\x00\x00\x01\xba", 0),)),
+)
+FAST_MAGIC_SIZE = max(len(magic) + address//8
+    for module, name, exts, magics in FAST_PARSERS
+    for magic, address in magics)
+_fast_classes = {}
+
+def _fastClass(module, name):
+    key = (module, name)
+    if key not in _fast_classes:
+        _fast_classes[key] = getattr(__import__(module, fromlist=[name]), name)
+    return _fast_classes[key]
+
+def fastParser(stream):
+    """
+    Try the FAST_PARSERS matching the magic bytes of the stream and then the
+    ones matching its file extension. Only their modules are imported.
+
+    Returns None if the stream has other tags than its filename or if no
+    fast parser validates it.
+    """
+    ext = None
+    for tag in stream.tags:
+        if not isinstance(tag, tuple) or tag[0] != "filename":
+            return None
+        filename = os.path.basename(tag[1]).split(".")
+        if 1 < len(filename):
+            ext = filename[-1].lower()
+
+    try:
+        if stream.sizeGe(FAST_MAGIC_SIZE*8):
+            header = stream.readBytes(0, FAST_MAGIC_SIZE)
+        else:
+            header = ""
+    except HACHOIR_ERRORS:
+        return None
+
+    by_magic = []
+    by_ext = []
+    for module, name, exts, magics in FAST_PARSERS:
+        for magic, address in magics:
+            if header[address//8:address//8 + len(magic)] == magic:
+                by_magic.append((module, name))
+                break
+        else:
+            if ext in exts:
+                by_ext.append((module, name))
+
+    for module, name in by_magic + by_ext:
+        try:
+            return _fastClass(module, name)(stream, validate=True)
+        except HACHOIR_ERRORS as err:
+            info(_("Skip fast parser '%s': %s") % (name, makeUnicode(err)))
+    return None
+
 
 class QueryParser(object):
     fallback = None
@@ -120,6 +197,10 @@ class QueryParser(object):
 
 
 def guessParser(stream):
+    parser = fastParser(stream)
+    if parser is not None:
+        stream._cached_parser = weakref.ref(parser)
+        return parser
     return QueryParser(stream.tags).parse(stream)
 
 
@@ -1,18 +1,20 @@
-from hachoir_parser.misc.file_3do import File3do
-from hachoir_parser.misc.file_3ds import File3ds
-from hachoir_parser.misc.torrent import TorrentFile
-from hachoir_parser.misc.ttf import TrueTypeFontFile
-from hachoir_parser.misc.chm import ChmFile
-from hachoir_parser.misc.lnk import LnkFile
-from hachoir_parser.misc.pcf import PcfFile
-from hachoir_parser.misc.ole2 import OLE2_File
-from hachoir_parser.misc.pdf import PDFDocument
-from hachoir_parser.misc.pifv import PIFVFile
-from hachoir_parser.misc.hlp import HlpFile
-from hachoir_parser.misc.gnome_keyring import GnomeKeyring
-from hachoir_parser.misc.bplist import BPList
-from hachoir_parser.misc.dsstore import DSStore
-from hachoir_parser.misc.word_doc import WordDocumentParser
-from hachoir_parser.misc.word_2 import Word2DocumentParser
-from hachoir_parser.misc.mstask import MSTaskFile
-from hachoir_parser.misc.mapsforge_map import MapsforgeMapFile
+PARSERS = (
+    "bplist.BPList",
+    "chm.ChmFile",
+    "dsstore.DSStore",
+    "file_3do.File3do",
+    "file_3ds.File3ds",
+    "gnome_keyring.GnomeKeyring",
+    "hlp.HlpFile",
+    "lnk.LnkFile",
+    "mstask.MSTaskFile",
+    "mapsforge_map.MapsforgeMapFile",
+    "ole2.OLE2_File",
+    "pdf.PDFDocument",
+    "pifv.PIFVFile",
+    "pcf.PcfFile",
+    "torrent.TorrentFile",
+    "ttf.TrueTypeFontFile",
+    "word_2.Word2DocumentParser",
+    "word_doc.WordDocumentParser",
+)
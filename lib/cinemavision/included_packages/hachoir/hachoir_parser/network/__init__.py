@@ -1,2 +1,3 @@
-from hachoir_parser.network.tcpdump import TcpdumpFile
-
+PARSERS = (
+    "tcpdump.TcpdumpFile",
+)
@@ -1,6 +1,5 @@
 from hachoir_core.field import FieldSet, Field, Bits
 from hachoir_core.bits import str2hex
-from hachoir_parser.network.ouid import REGISTERED_OUID
 from hachoir_core.endian import BIG_ENDIAN
 from socket import gethostbyaddr, herror as socket_host_error
 
@@ -64,6 +63,8 @@ class OrganizationallyUniqueIdentifier(Bits):
 
     def createDisplay(self, human=True):
         if human:
+            # The OUID table is huge: only import it when displaying a value
+            from hachoir_parser.network.ouid import REGISTERED_OUID
             key = self.value
             if key in REGISTERED_OUID:
                 return REGISTERED_OUID[key]
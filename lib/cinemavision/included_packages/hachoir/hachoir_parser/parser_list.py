@@ -1,8 +1,6 @@
 import re
-import types
 from hachoir_core.error import error
 from hachoir_core.i18n import _
-from hachoir_parser import Parser, HachoirParser
 import sys
 
 ### Parser list ################################################################
@@ -175,6 +173,9 @@ class ParserList(object):
 
 
 class HachoirParserList(ParserList):
+    # Parser packages, each one lists its parsers as "module.Class" in PARSERS
+    MODULES = ("archive", "audio", "container", "file_system", "game",
+        "image", "misc", "network", "program", "video")
     _instance = None
 
     @classmethod
@@ -191,26 +192,21 @@ class HachoirParserList(ParserList):
         """
         Load all parsers from "hachoir.parser" module.
 
+        Parser modules are only imported here (or by the fast path of
+        createParser()), not by "import hachoir_parser".
+
         Return the list of loaded parsers.
         """
         # Parser list is already loaded?
         if self.parser_list:
             return self.parser_list
 
-        todo = []
-        module = __import__("hachoir_parser")
-        for attrname in dir(module):
-            attr = getattr(module, attrname)
-            if isinstance(attr, types.ModuleType):
-                todo.append(attr)
-
-        for module in todo:
-            for name in dir(module):
-                attr = getattr(module, name)
-                if isinstance(attr, type) \
-                and issubclass(attr, HachoirParser) \
-                and attr not in (Parser, HachoirParser):
-                    self.add(attr)
+        for category in self.MODULES:
+            package = "hachoir_parser." + category
+            for name in __import__(package, fromlist=["PARSERS"]).PARSERS:
+                module, name = name.rsplit(".", 1)
+                module = __import__("%s.%s" % (package, module), fromlist=[name])
+                self.add(getattr(module, name))
         assert 1 <= len(self.parser_list)
         return self.parser_list
 
@@ -1,7 +1,8 @@
-from hachoir_parser.program.elf import ElfFile
-from hachoir_parser.program.exe import ExeFile
-from hachoir_parser.program.python import PythonCompiledFile
-from hachoir_parser.program.java import JavaCompiledClassFile
-from hachoir_parser.program.prc import PRCFile
-from hachoir_parser.program.nds import NdsFile
-
+PARSERS = (
+    "elf.ElfFile",
+    "exe.ExeFile",
+    "java.JavaCompiledClassFile",
+    "nds.NdsFile",
+    "prc.PRCFile",
+    "python.PythonCompiledFile",
+)
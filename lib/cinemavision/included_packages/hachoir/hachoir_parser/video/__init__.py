@@ -1,6 +1,7 @@
-from hachoir_parser.video.asf import AsfFile
-from hachoir_parser.video.flv import FlvFile
-from hachoir_parser.video.mov import MovFile
-from hachoir_parser.video.mpeg_video import MPEGVideoFile
-from hachoir_parser.video.mpeg_ts import MPEG_TS
-
+PARSERS = (
+    "asf.AsfFile",
+    "flv.FlvFile",
+    "mpeg_video.MPEGVideoFile",
+    "mpeg_ts.MPEG_TS",
+    "mov.MovFile",
+)
@@ -24,7 +24,7 @@ from mutagen._file import setFileOpener
 from mutagen._file import FileOpener
 
 from mutagen._util import MutagenError
-from mutagen._file import FileType, StreamInfo, File
+from mutagen._file import FileType, StreamInfo, File, FileByExtension
 from mutagen._tags import Metadata
 
 version = (1, 30, -1)
@@ -41,6 +41,8 @@ StreamInfo
 
 File
 
+FileByExtension
+
 Metadata
 
 setFileOpener
@@ -5,11 +5,14 @@
 # it under the terms of version 2 of the GNU General Public License as
 # published by the Free Software Foundation.
 
+import os
+import threading
 import warnings
 
-from mutagen._util import DictMixin
+from mutagen._util import DictMixin, MutagenError
 
 _fileopener = [open]
+_shared = threading.local()
 
 
 def setFileOpener(opener):
@@ -17,9 +20,37 @@ def setFileOpener(opener):
 
 
 def FileOpener(*args, **kwargs):
+    shared = getattr(_shared, 'file', None)
+    if shared and args and args[0] == shared[0]:
+        mode = len(args) > 1 and args[1] or kwargs.get('mode', 'r')
+        if mode == 'rb':
+            return _SharedFile(shared[1])
     return _fileopener[0](*args, **kwargs)
 
 
+class _SharedFile(object):
+    """A file already opened by :func:`FileByExtension`, handed out in
+    place of opening it again. Starts at the beginning of the file and
+    closing it leaves the real file open.
+    """
+
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+        fileobj.seek(0)
+
+    def __getattr__(self, attr):
+        return getattr(self._fileobj, attr)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    def close(self):
+        pass
+
+
 class FileType(DictMixin):
     """An abstract object wrapping tags and audio stream information.
 
@@ -247,3 +278,98 @@ def File(filename, options=None, easy=False):
         return Kind(filename)
     else:
         return None
+
+
+#: Candidate kinds as (module, class name) by file extension
+_KINDS_BY_EXTENSION = {
+    '.mp3': [('mutagen.mp3', 'MP3')],
+    '.mp2': [('mutagen.mp3', 'MP3')],
+    '.mpga': [('mutagen.mp3', 'MP3')],
+    '.flac': [('mutagen.flac', 'FLAC')],
+    '.ogg': [('mutagen.oggtheora', 'OggTheora'),
+             ('mutagen.oggspeex', 'OggSpeex'),
+             ('mutagen.oggvorbis', 'OggVorbis'),
+             ('mutagen.oggflac', 'OggFLAC'),
+             ('mutagen.oggopus', 'OggOpus')],
+    '.oga': [('mutagen.oggvorbis', 'OggVorbis'),
+             ('mutagen.oggflac', 'OggFLAC'),
+             ('mutagen.oggopus', 'OggOpus')],
+    '.opus': [('mutagen.oggopus', 'OggOpus')],
+    '.spx': [('mutagen.oggspeex', 'OggSpeex')],
+    '.ogv': [('mutagen.oggtheora', 'OggTheora')],
+    '.m4a': [('mutagen.mp4', 'MP4')],
+    '.m4b': [('mutagen.mp4', 'MP4')],
+    '.m4p': [('mutagen.mp4', 'MP4')],
+    '.mp4': [('mutagen.mp4', 'MP4')],
+    '.aac': [('mutagen.aac', 'AAC'), ('mutagen.mp4', 'MP4')],
+    '.wma': [('mutagen.asf', 'ASF')],
+    '.asf': [('mutagen.asf', 'ASF')],
+    '.aif': [('mutagen.aiff', 'AIFF')],
+    '.aiff': [('mutagen.aiff', 'AIFF')],
+    '.aifc': [('mutagen.aiff', 'AIFF')],
+    '.ape': [('mutagen.monkeysaudio', 'MonkeysAudio')],
+    '.mpc': [('mutagen.musepack', 'Musepack')],
+    '.wv': [('mutagen.wavpack', 'WavPack')],
+    '.tta': [('mutagen.trueaudio', 'TrueAudio')],
+    '.ofr': [('mutagen.optimfrog', 'OptimFROG')],
+    '.ofs': [('mutagen.optimfrog', 'OptimFROG')],
+}
+
+
+#: Loaders of the stream information alone, see FileByExtension(info_only)
+_INFO_KINDS_BY_EXTENSION = {
+    '.mp3': ('mutagen.mp3', 'MP3Info'),
+    '.mp2': ('mutagen.mp3', 'MP3Info'),
+    '.mpga': ('mutagen.mp3', 'MP3Info'),
+}
+
+
+def _kind(module, name):
+    return getattr(__import__(module, fromlist=[name]), name)
+
+
+def FileByExtension(filename, info_only=False):
+    """Like :func:`File`, but opens the file only once and only imports
+    and scores the formats that go with the filename extension.
+
+    Every open of the file while it loads reuses the first one, which
+    matters when opening is expensive (for instance over a network share).
+    When no format for the extension matches, or the extension is unknown,
+    all formats are tried as :func:`File` does.
+
+    With info_only, formats that can load their stream information without
+    the tags do so (see :class:`mutagen.mp3.MP3Info`). Only ``info`` is
+    meant to be used on what is returned.
+    """
+
+    ext = os.path.splitext(filename)[1].lower()
+    candidates = _KINDS_BY_EXTENSION.get(ext, [])
+    info_kind = info_only and _INFO_KINDS_BY_EXTENSION.get(ext)
+
+    fileobj = _fileopener[0](filename, "rb")
+    try:
+        _shared.file = (filename, fileobj)
+        try:
+            if info_kind:
+                try:
+                    return _kind(*info_kind)(filename)
+                except (MutagenError, IOError):
+                    pass  # Not what the extension says, sniff it
+
+            if candidates:
+                header = fileobj.read(128)
+                results = []
+                for module, name in candidates:
+                    Kind = _kind(module, name)
+                    results.append(
+                        ((Kind.score(filename, fileobj, header), name), Kind))
+                results.sort(key=lambda r: r[0])
+                (score, name), Kind = results[-1]
+                if score > 0:
+                    return Kind(filename)
+
+            return File(filename)
+        finally:
+            _shared.file = None
+    finally:
+        fileobj.close()
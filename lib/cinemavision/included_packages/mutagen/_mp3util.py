@@ -418,3 +418,127 @@ class VBRIHeader(object):
         assert info.layer == 3
 
         return 36
+
+
+# Bitrates in kbps by (version, layer) and sample rates by version, indexed
+# by the header fields
+_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224,
+             256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128,
+             160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112,
+             128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128,
+             144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64,
+             80, 96, 112, 128, 144, 160],
+}
+_BITRATES[(2, 3)] = _BITRATES[(2, 2)]
+for _layer in range(1, 4):
+    _BITRATES[(2.5, _layer)] = _BITRATES[(2, _layer)]
+
+_SAMPLE_RATES = {
+    1: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    2.5: [11025, 12000, 8000]
+}
+
+
+def frame_info(data, pos=0):
+    """Parses the MPEG frame header at data[pos:pos + 4].
+
+    Returns (frame length in bytes, samples per frame, sample rate, bitrate)
+    or None if there is no valid header there.
+    """
+
+    header = data[pos:pos + 4]
+    if len(header) < 4:
+        return None
+
+    frame_data = cdata.uint32_be(header)
+    if ((frame_data >> 16) & 0xFFE0) != 0xFFE0:
+        return None
+
+    version = (frame_data >> 19) & 0x3
+    layer = (frame_data >> 17) & 0x3
+    bitrate = (frame_data >> 12) & 0xF
+    sample_rate = (frame_data >> 10) & 0x3
+    padding = (frame_data >> 9) & 0x1
+    if (version == 1 or layer == 0 or sample_rate == 0x3 or
+            bitrate == 0 or bitrate == 0xF):
+        return None
+
+    version = [2.5, None, 2, 1][version]
+    layer = 4 - layer
+    bitrate = _BITRATES[(version, layer)][bitrate] * 1000
+    sample_rate = _SAMPLE_RATES[version][sample_rate]
+
+    if layer == 1:
+        length, samples = ((12 * bitrate // sample_rate) + padding) * 4, 384
+    elif version >= 2 and layer == 3:
+        length, samples = (72 * bitrate // sample_rate) + padding, 576
+    else:
+        length, samples = (144 * bitrate // sample_rate) + padding, 1152
+    return length, samples, sample_rate, bitrate
+
+
+def frame_run(data, pos, frames):
+    """Follows up to `frames` consecutive valid frames in data starting at
+    pos. Returns (bytes, seconds, set of bitrates, frame count).
+    """
+
+    run_bytes = 0
+    run_time = 0.0
+    bitrates = set()
+    count = 0
+    while count < frames:
+        info = frame_info(data, pos)
+        if info is None:
+            break
+        length, samples, sample_rate, bitrate = info
+        if pos + length > len(data):
+            break
+        bitrates.add(bitrate)
+        run_bytes += length
+        run_time += float(samples) / sample_rate
+        count += 1
+        pos += length
+    return run_bytes, run_time, bitrates, count
+
+
+def sample_bitrate(fileobj, start, end, points=8, frames=32, chunk=8192):
+    """Estimates the average bitrate of the MPEG audio between start and
+    end by reading up to `frames` consecutive frames at `points` evenly
+    spaced positions. At most points * chunk bytes are read, and sampling
+    stops after three points if every frame so far had the same bitrate.
+
+    Only runs of at least two consecutive valid frames are counted so
+    stray sync bytes are not mistaken for frames. Returns the bitrate in
+    bits per second, or None if no frames were found.
+    """
+
+    total_bytes = 0
+    total_time = 0.0
+    bitrates = set()
+    for i in xrange(points):
+        if i >= 3 and len(bitrates) == 1:
+            break  # CBR
+
+        fileobj.seek(start + (end - start) * i // points, 0)
+        data = fileobj.read(chunk)
+
+        pos = data.find(b"\xff")
+        while 0 <= pos <= len(data) - 4:
+            run_bytes, run_time, run_bitrates, count = frame_run(
+                data, pos, frames)
+            if count >= 2:
+                total_bytes += run_bytes
+                total_time += run_time
+                bitrates.update(run_bitrates)
+                break
+            pos = data.find(b"\xff", pos + 1)
+
+    if not total_time:
+        return None
+    return total_bytes * 8 / total_time
@@ -12,12 +12,13 @@ import os
 import struct
 
 from ._compat import endswith
-from ._mp3util import XingHeader, XingHeaderError, VBRIHeader, VBRIHeaderError
-from mutagen import StreamInfo
+from ._mp3util import XingHeader, XingHeaderError, VBRIHeader, VBRIHeaderError, \
+    frame_run, sample_bitrate
+from mutagen import StreamInfo, FileOpener
 from mutagen._util import MutagenError, enum
 from mutagen.id3 import ID3FileType, BitPaddedInt, delete
 
-__all__ = ["MP3", "Open", "delete", "MP3"]
+__all__ = ["MP3", "Open", "delete", "MP3", "MP3Info"]
 
 
 class error(RuntimeError, MutagenError):
@@ -136,17 +137,26 @@ class MPEGInfo(StreamInfo):
     }
 
     sketchy = False
+    vbr_header = False
     encoder_info = u""
     bitrate_mode = BitrateMode.UNKNOWN
     track_gain = track_peak = album_gain = album_peak = None
 
-    def __init__(self, fileobj, offset=None):
+    def __init__(self, fileobj, offset=None, sample_frames=False):
         """Parse MPEG stream information from a file-like object.
 
         If an offset argument is given, it is used to start looking
         for stream information and Xing headers; otherwise, ID3v2 tags
         will be skipped automatically. A correct offset can make
         loading files significantly faster.
+
+        Without a Xing or VBRI header the length comes from the bitrate
+        of the first frame, which is wrong for most VBR files. With
+        sample_frames the frames already read at the start are checked
+        first. If they all have the same bitrate the file is taken to be
+        CBR. Otherwise the bitrate is averaged over frames sampled at a
+        few points in the file (see _mp3util.sample_bitrate), so only
+        VBR files without a header seek through the file.
         """
 
         try:
@@ -185,6 +195,17 @@ class MPEGInfo(StreamInfo):
             self.__try(fileobj, offset, size - offset, False)
             self.sketchy = True
 
+        if sample_frames and not self.vbr_header and not self.__uniform():
+            bitrate = sample_bitrate(fileobj, offset, size)
+            if bitrate:
+                self.length = 8 * (size - offset) / bitrate
+                self.bitrate = int(bitrate)
+
+    def __uniform(self):
+        data, pos = self.__first_frames
+        bitrates, count = frame_run(data, pos, len(data))[2:]
+        return count >= 2 and len(bitrates) == 1
+
     def __try(self, fileobj, offset, real_size, check_second=True):
         # This is going to be one really long function; bear with it,
         # because there's not really a sane point to cut it up.
@@ -222,6 +243,7 @@ class MPEGInfo(StreamInfo):
         else:
             raise HeaderNotFoundError("can't sync to an MPEG frame")
 
+        self.__first_frames = (data, frame_1)
         self.channels = 1 if self.mode == MONO else 2
 
         # There is a serious problem here, which is that many flags
@@ -276,6 +298,7 @@ class MPEGInfo(StreamInfo):
         else:
             lame = xing.lame_header
             self.sketchy = False
+            self.vbr_header = True
             self.bitrate_mode = _guess_xing_bitrate_mode(xing)
             if xing.frames != -1:
                 samples = frame_size * xing.frames
@@ -304,6 +327,7 @@ class MPEGInfo(StreamInfo):
             self.bitrate_mode = BitrateMode.VBR
             self.encoder_info = u"FhG"
             self.sketchy = False
+            self.vbr_header = True
             self.length = float(frame_size * vbri.frames) / self.sample_rate
             if self.length:
                 self.bitrate = int((vbri.bytes * 8) / self.length)
@@ -351,6 +375,25 @@ class MP3(ID3FileType):
 Open = MP3
 
 
+class MP3Info(object):
+    """Only the stream information of an MPEG audio file, for when just
+    the length is needed.
+
+    The ID3v2 tag is skipped without being parsed and frames are sampled
+    when there is no Xing or VBRI header, so at most a few blocks of the
+    file are read.
+
+    :ivar info: :class:`MPEGInfo`
+    """
+
+    tags = None
+
+    def __init__(self, filename):
+        self.filename = filename
+        with FileOpener(filename, "rb") as fileobj:
+            self.info = MPEGInfo(fileobj, sample_frames=True)
+
+
 class EasyMP3(MP3):
     """Like MP3, but uses EasyID3 for tags.
 
@@ -1,6 +1,9 @@
+import os
+import re
+import json
+import threading
 import util
 import database as DB
-from xml.etree import ElementTree as ET
 
 COUNTRY_SYSTEMS = {
     'DE': 'FSK',
@@ -12,8 +15,17 @@ COUNTRY_SYSTEMS = {
 
 DEFAULT_RATING_SYSTEM = None
 
+_RATING_CACHE = {}  # (system_or_name, name) -> Rating, cleared whenever the systems change
+_RATING_CACHE_MAX = 2000
+GENERATION = 0  # Incremented whenever the systems or the default system change, for caches built from them
+
+_LOADED = False
+_LOADING = False  # True while this thread's load() runs, so ensureLoaded() calls made by the load itself return
+_LOAD_LOCK = threading.RLock()
+
 
 def getSystemByCountry(country_code):
+    ensureLoaded()
     return COUNTRY_SYSTEMS.get(country_code)
 
 
@@ -31,11 +43,17 @@ def genValidIdentifier(seq):
     return ret
 
 
+def normalizeRatingName(name):
+    return re.sub(r'[\s_.-]', '', name.upper())
+
+
 class RatingSystem:
     name = ''
     ratings = None
     regEx = None
     regions = None
+    _index = None
+    _aliases = None
 
     def __repr__(self):
         return '{0}: {1}'.format(self.name, self.ratings)
@@ -46,18 +64,35 @@ class RatingSystem:
     def __getitem__(self, idx):
         return self.ratings[idx]
 
+    def _buildIndex(self):
+        # Exact names win over internal names, which win over aliases with spacing/punctuation removed (PG13, NC 17)
+        index = {}
+        aliases = {}
+        for r in self.ratings or ():
+            index.setdefault(r.name.upper(), r)
+        for r in self.ratings or ():
+            index.setdefault(r.internal.upper(), r)
+            aliases.setdefault(normalizeRatingName(r.name), r)
+            aliases.setdefault(normalizeRatingName(r.internal), r)
+        self._index = index
+        self._aliases = aliases
+
     def getRatingByName(self, name):
-        name = name.upper()
-        for r in self.ratings:
-            if r.name == name:
-                return r
-        return NO_RATING
+        if self._index is None:
+            self._buildIndex()
+
+        rating = self._index.get(name.upper())
+        if rating is None:
+            rating = self._aliases.get(normalizeRatingName(name), NO_RATING)
+        return rating
 
     def addRating(self, rating):
         if not self.ratings:
             self.ratings = []
         rating.system = self.name
         self.ratings.append(rating)
+        self._index = None
+        clearRatingCache()
 
     def addRegEx(self, context, regex):
         if not self.regEx:
@@ -136,6 +171,8 @@ class MPAA(RatingSystem):
 class XMLRatingSystem(RatingSystem):
     @classmethod
     def fromXML(cls, xml_string):
+        from xml.etree import ElementTree as ET
+
         system = cls()
 
         e = ET.fromstring(xml_string)
@@ -157,6 +194,33 @@ class XMLRatingSystem(RatingSystem):
 
         return system
 
+    @classmethod
+    def fromDict(cls, data):
+        system = cls()
+        system.name = data['name']
+        system.ratings = []
+
+        for context, regex in data['regex']:
+            system.addRegEx(context, regex)
+
+        for name, value, internal in data['ratings']:
+            rating = Rating(name, value, internal)
+            setattr(system, genValidIdentifier(rating.name), rating)
+            system.addRating(rating)
+
+        for region in data['regions']:
+            system.addRegion(region)
+
+        return system
+
+    def toDict(self):
+        return {
+            'name': self.name,
+            'regex': (self.regEx or {}).items(),
+            'ratings': [(r.name, r.value, r.internal) for r in self.ratings],
+            'regions': self.regions or []
+        }
+
 
 RATINGS_SYSTEMS = {
     'MPAA': MPAA()
@@ -167,11 +231,33 @@ NO_RATING = Rating('', 1000)
 
 
 def getRatingsSystem(name):
+    ensureLoaded()
     name = name.upper()
     return RATINGS_SYSTEMS.get(name)
 
 
+def getSystems():
+    ensureLoaded()
+    return RATINGS_SYSTEMS.values()
+
+
+def clearRatingCache():
+    global GENERATION
+    GENERATION += 1
+    _RATING_CACHE.clear()
+
+
 def getRating(system_or_name, name=None):
+    key = (system_or_name, name)
+    rating = _RATING_CACHE.get(key)
+    if rating is None:
+        if len(_RATING_CACHE) >= _RATING_CACHE_MAX:
+            _RATING_CACHE.clear()
+        rating = _RATING_CACHE[key] = _getRating(system_or_name, name)
+    return rating
+
+
+def _getRating(system_or_name, name=None):
     system = system_or_name
 
     if not name:
@@ -193,14 +279,19 @@ def getRating(system_or_name, name=None):
 
 
 def addRatingSystemFromXML(xml):
-    system = XMLRatingSystem.fromXML(xml)
+    ensureLoaded()
+    return addRatingSystem(XMLRatingSystem.fromXML(xml))
 
+
+def addRatingSystem(system):
     RATINGS_SYSTEMS[system.name.upper()] = system
+    clearRatingCache()
 
     return system
 
 
 def getRegExs(context=None):
+    ensureLoaded()
     ret = {}
     for system in RATINGS_SYSTEMS.values():
         regEx = system.getRegEx(context)
@@ -209,15 +300,94 @@ def getRegExs(context=None):
     return ret
 
 
+# Searches several named patterns in one pass per case sensitivity. Named groups are prefixed per
+# pattern so they can share an expression. search() returns (name, rating) for the earliest match,
+# matches at the same position go to the pattern that comes first in priority (then by name).
+class CombinedRegex:
+    GROUP_RE = re.compile(r'\(\?P([<=])(\w+)')
+
+    def __init__(self, patterns, priority=()):
+        def order(item):
+            if item[0] in priority:
+                return (priority.index(item[0]), item[0])
+            return (len(priority), item[0])
+
+        self.names = {}
+        self.order = {}
+        parts = {True: [], False: []}
+        for i, (name, pattern) in enumerate(sorted(patterns.items(), key=order)):
+            ignoreCase = pattern.startswith('(?i)')
+            if ignoreCase:
+                pattern = pattern[4:]
+            prefix = 'g{0}'.format(i)
+            pattern = self.GROUP_RE.sub(lambda m: '(?P{0}{1}_{2}'.format(m.group(1), prefix, m.group(2)), pattern)
+            parts[ignoreCase].append('(?P<{0}>{1})'.format(prefix, pattern))
+            self.names[prefix] = name
+            self.order[prefix] = i
+
+        self.regexs = [re.compile('|'.join(p), ignoreCase and re.I or 0) for ignoreCase, p in parts.items() if p]
+
+    def search(self, text):
+        best = None
+        for regex in self.regexs:
+            m = regex.search(text)
+            if m and (not best or (m.start(), self.order[m.lastgroup]) < (best.start(), self.order[best.lastgroup])):
+                best = m
+
+        if not best:
+            return None, None
+
+        group = best.lastgroup
+        try:
+            return self.names[group], best.group(group + '_rating')
+        except IndexError:
+            return self.names[group], best.group(group)
+
+
+# Expressions for rating strings as Kodi reports them. getParseRegExs() adds the expressions of the
+# loaded systems to these.
+KODI_SYSTEM_RATING_REs = {
+    # 'MPAA': r'(?i)^Rated\s(?P<rating>Unrated|NR|PG-13|PG|G|R|NC-17)',
+    'BBFC': r'(?i)^UK(?:\s+|:)(?P<rating>Uc|U|12A|12|PG|15|R18|18)',
+    'FSK': r'(?i)^(?:FSK|Germany)(?:\s+|:)(?P<rating>0|6|12|16|18|Unrated)',
+    'DEJUS': r'(?i)(?P<rating>Livre|10 Anos|12 Anos|14 Anos|16 Anos|18 Anos)'
+}
+
+KODI_RATING_REs = {
+    'MPAA': r'(?i)(?P<rating>Unrated|NR|PG-13|PG|G|R|NC-17)',
+    'BBFC': r'(?i)(?P<rating>Uc|U|12A|12|PG|15|R18|18)',
+    'FSK': r'(?i)(?P<rating>0|6|12|16|18|Unrated)',
+    'DEJUS': r'(?i)(?P<rating>Livre|10 Anos|12 Anos|14 Anos|16 Anos|18 Anos)'
+}
+
+# Which system wins when patterns match at the same position (PG-13 and BBFC's PG share a prefix).
+# These are the systems with built in expressions above, in the order the parser tried them one at a
+# time before the expressions were combined, so ratings resolve as they always have. Systems that only
+# come from XML or the database follow them by name.
+PARSE_PRIORITY = ('MPAA', 'FSK', 'DEJUS', 'BBFC')
+
+
+# Returns (system expression, rating expression, rating expressions by system) for parsing rating strings
+def getParseRegExs():
+    systemREs = dict(KODI_SYSTEM_RATING_REs)
+    systemREs.update(getRegExs('kodi'))
+    ratingREs = dict(KODI_RATING_REs)
+    ratingREs.update(getRegExs())
+
+    return CombinedRegex(systemREs, PARSE_PRIORITY), CombinedRegex(ratingREs, PARSE_PRIORITY), ratingREs
+
+
 def setCountry(country_code):
     global DEFAULT_RATING_SYSTEM
     DEFAULT_RATING_SYSTEM = getSystemByCountry(country_code)
+    clearRatingCache()
     util.DEBUG_LOG('Default rating system: {0}'.format(DEFAULT_RATING_SYSTEM))
 
 
 def setDefaultRatingSystem(system):
     global DEFAULT_RATING_SYSTEM
     DEFAULT_RATING_SYSTEM = system
+    clearRatingCache()
     util.DEBUG_LOG('Default rating system: {0}'.format(DEFAULT_RATING_SYSTEM))
 
 
@@ -226,15 +396,33 @@ def defaultRatingsSystem():
 
 
 def loadFromXML():
-    import os
-    import inspect
-
-    systemsFolder = os.path.join(os.path.realpath(os.path.abspath(os.path.split(inspect.getfile(inspect.currentframe()))[0])), 'rating_systems')
-    for p in os.listdir(systemsFolder):
-        path = os.path.join(systemsFolder, p)
-
-        with open(path, 'r') as f:
-            addRatingSystemFromXML(f.read())
+    systemsFolder = os.path.join(os.path.dirname(os.path.realpath(os.path.abspath(__file__))), 'rating_systems')
+    cachePath = os.path.join(util.STORAGE_PATH, 'rating_systems.cache')
+
+    # The parsed systems are cached, keyed by the file names and modification times of the XML files
+    key = dict((p, os.path.getmtime(os.path.join(systemsFolder, p))) for p in os.listdir(systemsFolder))
+
+    try:
+        if os.path.exists(cachePath):
+            with open(cachePath, 'r') as f:
+                cache = json.load(f)
+            if cache.get('key') == key:
+                for data in cache['systems']:
+                    addRatingSystem(XMLRatingSystem.fromDict(data))
+                return
+    except Exception:
+        util.ERROR('Failed to read rating systems cache')
+
+    systems = []
+    for p in sorted(key):
+        with open(os.path.join(systemsFolder, p), 'r') as f:
+            systems.append(addRatingSystem(XMLRatingSystem.fromXML(f.read())))
+
+    try:
+        with open(cachePath, 'w') as f:
+            json.dump({'key': key, 'systems': [s.toDict() for s in systems]}, f)
+    except Exception:
+        util.ERROR('Failed to write rating systems cache')
 
 
 @DB.session
@@ -256,15 +444,41 @@ def loadFromDB():
             continue
         RATINGS_SYSTEMS[rating.system].addRating(Rating(rating.name, rating.value, rating.internal))
 
+    clearRatingCache()
+
 
 def load():
-    DB.initialize()
-    loadFromXML()
-    loadFromDB()
+    global _LOADED, _LOADING
+
+    with _LOAD_LOCK:
+        _LOADING = True
+        try:
+            if not DB.DB:
+                DB.initialize()
+            loadFromXML()
+            loadFromDB()
+        finally:
+            _LOADING = False
+
+        # Only set once the systems are complete, ensureLoaded() checks it without the lock.
+        # If the load raised it is tried again on next use.
+        _LOADED = True
+
+        util.DEBUG_LOG('Rating Systems:')
+        for rs in RATINGS_SYSTEMS.values():
+            util.DEBUG_LOG('  {0}'.format(repr(rs)))
+
+
+def isLoaded():
+    return _LOADED
 
-    util.DEBUG_LOG('Rating Systems:')
-    for rs in RATINGS_SYSTEMS.values():
-        util.DEBUG_LOG('  {0}'.format(repr(rs)))
 
+# Rating systems are loaded on first use rather than at import, so entry points that never touch
+# ratings don't pay for opening the databases and parsing the system files
+def ensureLoaded():
+    if _LOADED:
+        return
 
-load()
+    with _LOAD_LOCK:
+        if not _LOADED and not _LOADING:
+            load()
@@ -100,13 +100,15 @@ def parseRatingsList(rlist):
     return rlist
 
 def unParseRatingsList(rlist):
-    for x in range(len(rlist)):
-        r = rlist[x]
+    ret = []
+    for r in rlist:
         if isinstance(r, list):
-            unParseRatingsList(r)
+            ret.append(unParseRatingsList(r))
         elif r:
-            rlist[x] = str(r)
-    return rlist
+            ret.append(str(r))
+        else:
+            ret.append(r)
+    return ret
 
 def getConditionValueString(itype, val):
     return util.strRepr(_getConditionValueString(itype, val))
@@ -147,6 +149,8 @@ class SequenceData(object):
         self._attrs = {}
         self._settings = {}
         self._loadPath = ''
+        self._compiled = None
+        self.summaryOnly = False
         self._process(data_string)
 
     def __nonzero__(self):
@@ -230,9 +234,19 @@ class SequenceData(object):
         obj._loadPath = path
         return obj
 
-    def save(self, path=None):
+    @classmethod
+    def fromSummary(cls, path, summary):
+        obj = cls(json.dumps(summary), path_name=re.split(r'[/\\]', path)[-1][:-6])
+        obj._loadPath = path
+        obj.summaryOnly = True
+        return obj
+
+    def save(self, path=None, update_index=True):
         path = path or self._loadPath
 
+        if self.summaryOnly:  # Don't write out a sequence without its items
+            self.setItems(self.load(self._loadPath)._items)
+
         if util.vfs.exists(path):
             util.vfs.delete(path)
 
@@ -255,36 +269,43 @@ class SequenceData(object):
         self.pathName = self.pathName or re.split(r'[/\\]', path)[-1][:-6]
         self.name = self.name or self.pathName
 
+        if update_index:
+            LIBRARY.update(path, self)
+
         return success
 
+    def summary(self):
+        attrs = self._attrs.copy()
+        attrs['ratings'] = unParseRatingsList(self._attrs.get('ratings') or [])
+
+        return {
+            'name': self.name,
+            'active': self.active,
+            'attributes': attrs,
+            'settings': self._settings
+        }
+
     def serialize(self):
         data = []
         for i in self._items:
             data.append(i.toDict())
 
-        attrs = self._attrs.copy()
-        attrs['ratings'] = unParseRatingsList(self._attrs.get('ratings') or [])
+        sdict = self.summary()
+        sdict['version'] = SAVE_VERSION
+        sdict['items'] = data
 
-        return json.dumps(
-            {
-                'version': SAVE_VERSION,
-                'name': self.name,
-                'active': self.active,
-                'items': data,
-                'attributes': attrs,
-                'settings': self._settings
-            },
-            indent=1
-        )
+        return json.dumps(sdict, indent=1)
 
     def setItems(self, items):
         self._items = items
+        self.summaryOnly = False
 
     def get(self, key, default=None):
         return self._attrs.get(key, default)
 
     def set(self, key, value):
         self._attrs[key] = value
+        self._compiled = None
 
     def visibleInDialog(self, val=None):
         if val is None:
@@ -294,159 +315,317 @@ class SequenceData(object):
 
         return val
 
+    def compiled(self):
+        if not self._compiled:
+            self._compiled = CompiledSequence(self)
+        return self._compiled
+
     def matchesFeatureAttr(self, attr, feature):
         try:
-            if attr == 'type':
-                if self.get('type') == '3D':
-                    if feature.is3D:
-                        return 5
-                    else:
-                        return -1
-                elif self.get('type') == '2D':
-                    if not feature.is3D:
-                        return 5
-                    else:
-                        return -1
-            elif attr == 'studio':
-                sMatch = [s.lower() for s in self.get('studios', []) if s]
-                if not sMatch:
-                    return 0
-                for studio in feature.studios:
-                    if studio.lower() in sMatch or re.sub(r'\s?studios?(\s?)', r'\1', studio.lower()) in sMatch:
-                        return 5
-                else:
-                    return -1
-            elif attr == 'director':
-                dMatch = [s.lower() for s in self.get('directors', []) if s]
-                if not dMatch:
-                    return 0
-                for director in feature.directors:
-                    if director.lower() in dMatch:
-                        return 5
-                else:
-                    return -1
-            elif attr == 'actor':
-                aMatch = [a.lower() for a in self.get('actors', []) if a]
-                if not aMatch:
-                    return 0
-                for role in feature.cast:
-                    if role['name'].lower() in aMatch:
-                        return 5
-                else:
-                    return -1
-            elif attr == 'tags':
-                tMatch = [t.lower() for t in self.get('tags', []) if t]
-                if not tMatch:
-                    return 0
-                for tag in feature.tags:
-                    if tag.lower() in tMatch:
-                        return 5
-                else:
-                    return -1
-            elif attr == 'year':
-                years = self.get('year', [])
-
-                if not years:
-                    return 0
-
-                ret = 0
-                for year in years:
-                    ret = -1
-                    if len(year) > 1:
-                        if not year[1]:
-                            if year[0] <= feature.year:
-                                return 5
-                        else:
-                            if year[1] <= feature.year <= year[2]:
-                                return 5
-                    else:
-                        if year[0] == feature.year:
-                            return 5
-                return ret
-            elif attr == 'dates':
-                dates = self.get('dates', [])
-
-                if not dates:
-                    return 0
-
-                now = datetime.datetime.now()
-
-                ret = 0
-                for date in dates:
-                    ret = -1
-                    if len(date) > 1:
-                        if datetime.date(now.year, date[0][0], date[0][1]) <= now <= datetime.date(now.year, date[1][0], date[1][1]):
-                            return 5
-                    else:
-                        if date[0][0] == now.month and date[0][1] == now.day:
-                            return 5
-                return ret
-            elif attr == 'times':
-                times = self.get('times', [])
-
-                if not times:
-                    return 0
-
-                now = datetime.datetime.now()
-
-                ret = 0
-                for tm in times:
-                    ret = -1
-                    if len(tm) > 1:
-                        if datetime.time(tm[0][0], tm[0][1]) <= datetime.time(now.hour, now.minute) <= datetime.time(tm[1][0], tm[1][1]):
-                            return 5
-                    else:
-                        if tm[0][0] == now.hour:
-                            return 5
-                return ret
-            elif attr == 'genre':
-                genres = [s.lower() for s in self.get('genres', []) if s]
-                if not genres:
-                    return 0
-                val = 5
-                ret = 0
-                for g in feature.genres:
-                    if g.lower() in genres:
-                        ret += val
-                    val -= 2
-                    if val < 1:
-                        break
-
-                if ret:
-                    return ret
-                else:
-                    return -1
-            elif attr == 'ratings':
-                ratingsList = self.get('ratings', [])
-
-                if not ratingsList:
-                    return 0
-
-                ret = 0
-                for rating in ratingsList:
-                    ret = -1
-                    if len(rating) > 1:
-                        if not rating[1]:
-                            if rating[0] <= feature.rating:
-                                return 5
-                        elif not rating[0]:
-                            if rating[1] >= feature.rating:
-                                return 5
-                        else:
-                            if rating[0] <= feature.rating <= rating[1]:
-                                return 5
-                    else:
-                        if rating[0] == feature.rating:
-                            return 5
-                return ret
-
-            return 0
+            return self.compiled().score(attr, FeatureValues(feature))
         except Exception:
             util.ERROR()
 
         return 0
 
 
+# Keeps parsed sequences in memory by path and modification time. A summary of each sequence
+# (name, active, settings and attributes) is kept in an index in the profile directory so listing
+# and matching sequences only needs to open files that changed since they were last read.
+class SequenceLibrary(object):
+    INDEX_VERSION = 1
+
+    def __init__(self, index_path=None):
+        self.indexPath = index_path or os.path.join(util.STORAGE_PATH, 'sequences.index')
+        self._sequences = {}  # Path -> (mtime, SequenceData)
+        self._summaries = {}  # Path -> (mtime, SequenceData with attributes only)
+        self._index = None
+
+    def _getIndex(self):
+        if self._index is None:
+            self._index = {}
+            try:
+                if os.path.exists(self.indexPath):
+                    with open(self.indexPath, 'r') as f:
+                        data = json.load(f)
+                    if data.get('version') == self.INDEX_VERSION:
+                        self._index = data.get('sequences', {})
+            except Exception:
+                util.ERROR('Failed to read sequence index')
+
+        return self._index
+
+    def _saveIndex(self):
+        try:
+            with open(self.indexPath, 'w') as f:
+                json.dump({'version': self.INDEX_VERSION, 'sequences': self._getIndex()}, f)
+        except Exception:
+            util.ERROR('Failed to write sequence index')
+
+    def _setEntry(self, path, mtime, seq_data):
+        self._getIndex()[path] = {'mtime': mtime, 'summary': seq_data.summary()}
+        self._summaries.pop(path, None)
+
+    # The full sequence, parsed again only if the file has changed
+    def load(self, path):
+        mtime = util.mtime(path)
+        cached = self._sequences.get(path)
+        if cached and mtime and cached[0] == mtime:
+            return cached[1]
+
+        seqData = SequenceData.load(path)
+        self._sequences[path] = (mtime, seqData)
+        self._setEntry(path, mtime, seqData)
+        return seqData
+
+    # Called after a sequence is written so the index doesn't need to re-read it
+    def update(self, path, seq_data):
+        self._sequences.pop(path, None)  # The caller may keep editing seq_data, so it isn't cached
+        self._setEntry(path, util.mtime(path), seq_data)
+        self._saveIndex()
+
+    # Sequences in a directory. Unchanged files come from the index and only have their attributes loaded,
+    # use load() on their path for the items.
+    def sequences(self, sequences_path):
+        index = self._getIndex()
+        modified = False
+        ret = []
+        paths = set()
+
+        for p in util.vfs.listdir(sequences_path):
+            if not p.endswith('.cvseq'):
+                continue
+
+            path = util.pathJoin(sequences_path, p)
+            paths.add(path)
+            mtime = util.mtime(path)
+
+            cached = self._sequences.get(path)
+            if cached and mtime and cached[0] == mtime:
+                ret.append(cached[1])
+                continue
+
+            entry = index.get(path)
+            if entry and mtime and entry['mtime'] == mtime:
+                summary = self._summaries.get(path)
+                if not summary or summary[0] != mtime:
+                    summary = (mtime, SequenceData.fromSummary(path, entry['summary']))
+                    self._summaries[path] = summary
+                ret.append(summary[1])
+                continue
+
+            try:
+                ret.append(self.load(path))
+                modified = True
+            except Exception:
+                util.ERROR('Failed to load: {0}'.format(util.strRepr(path)))
+
+        sep = util.getSep(sequences_path)
+        prefix = sequences_path.rstrip('/\\') + sep
+        for path in [p for p in index if p.startswith(prefix) and p not in paths]:
+            del index[path]
+            self._sequences.pop(path, None)
+            self._summaries.pop(path, None)
+            modified = True
+
+        if modified:
+            self._saveIndex()
+
+        return ret
+
+
+LIBRARY = SequenceLibrary()
+
+
+def _inRange(start, end, val):
+    if start <= end:
+        return start <= val <= end
+    return val >= start or val <= end  # Wraps around the end of the year/day
+
+
+# The feature's values normalized once per match
+class FeatureValues(object):
+    def __init__(self, feature):
+        self.is3D = feature.is3D
+        self.year = feature.year
+        self.rating = feature.rating
+
+        studios = set()
+        for studio in feature.studios:
+            studio = studio.lower()
+            studios.add(studio)
+            studios.add(re.sub(r'\s?studios?(\s?)', r'\1', studio))
+
+        self.values = {
+            'studio': studios,
+            'director': set(d.lower() for d in feature.directors),
+            'actor': set(r['name'].lower() for r in feature.cast),
+            'tags': set(t.lower() for t in feature.tags)
+        }
+        self.genres = [g.lower() for g in feature.genres[:3]]
+        now = datetime.datetime.now()
+        self.date = (now.month, now.day)
+        self.time = (now.hour, now.minute)
+
+
+# A sequence's conditions with names lowercased into frozensets and ranges into tuples
+class CompiledSequence(object):
+    VALUE_ATTRS = (('studio', 'studios'), ('director', 'directors'), ('actor', 'actors'), ('tags', 'tags'))
+    GENRE_SCORES = (5, 3, 1)
+
+    def __init__(self, seq_data):
+        self.sequence = seq_data
+        self.type = seq_data.get('type')
+        self.values = {}
+        for attr, key in self.VALUE_ATTRS:
+            self.values[attr] = frozenset(v.lower() for v in seq_data.get(key) or [] if v)
+        self.genres = frozenset(g.lower() for g in seq_data.get('genres') or [] if g)
+        self.years = [tuple(y) for y in seq_data.get('year') or []]
+        self.ratings = [tuple(r) for r in seq_data.get('ratings') or []]
+        self.dates = [tuple(tuple(d) for d in date) for date in seq_data.get('dates') or []]
+        self.times = [tuple(tuple(t) for t in tm) for tm in seq_data.get('times') or []]
+
+    def constrains(self, attr):
+        if attr == 'type':
+            return self.type in ('3D', '2D')
+        elif attr in self.values:
+            return bool(self.values[attr])
+        elif attr == 'genre':
+            return bool(self.genres)
+        return bool(self.ranges(attr))
+
+    def ranges(self, attr):
+        if attr == 'year':
+            return self.years
+        elif attr == 'ratings':
+            return self.ratings
+        elif attr == 'dates':
+            return self.dates
+        elif attr == 'times':
+            return self.times
+        return None
+
+    def matchesRange(self, attr, fv):
+        for r in self.ranges(attr):
+            if attr == 'year':
+                if len(r) > 1:
+                    if fv.year >= r[0] and (not r[1] or fv.year <= r[1]):
+                        return True
+                elif r[0] == fv.year:
+                    return True
+            elif attr == 'ratings':
+                if len(r) > 1:
+                    if (not r[0] or r[0] <= fv.rating) and (not r[1] or r[1] >= fv.rating):
+                        return True
+                elif r[0] == fv.rating:
+                    return True
+            elif attr == 'dates':
+                if len(r) > 1:
+                    if _inRange(r[0], r[1], fv.date):
+                        return True
+                elif r[0] == fv.date:
+                    return True
+            elif attr == 'times':
+                if len(r) > 1:
+                    if _inRange(r[0], r[1], fv.time):
+                        return True
+                elif r[0][0] == fv.time[0]:
+                    return True
+        return False
+
+    # 0 if the sequence has no condition for attr, -1 if the feature fails it, otherwise a positive score
+    def score(self, attr, fv):
+        if not self.constrains(attr):
+            return 0
+
+        if attr == 'type':
+            return (self.type == '3D') == bool(fv.is3D) and 5 or -1
+        elif attr in self.values:
+            return not self.values[attr].isdisjoint(fv.values[attr]) and 5 or -1
+        elif attr == 'genre':
+            ret = sum(val for g, val in zip(fv.genres, self.GENRE_SCORES) if g in self.genres)
+            return ret or -1
+
+        return self.matchesRange(attr, fv) and 5 or -1
+
+
+# Chooses the best sequence for a feature. Name conditions are looked up in per-attribute inverted
+# indexes so only sequences that can match are scored.
+class SequenceMatcher(object):
+    PRIORITY = ('type', 'ratings', 'year', 'studio', 'director', 'actor', 'genre', 'tags', 'dates', 'times')
+
+    def __init__(self, sequences):
+        self.sequences = [s.compiled() for s in sequences]
+        self.unconstrained = {}
+        self.constrained = {}
+        self.index = {}
+
+        for attr in self.PRIORITY:
+            self.unconstrained[attr] = set()
+            self.constrained[attr] = set()
+            self.index[attr] = {}
+
+        for i, cs in enumerate(self.sequences):
+            for attr in self.PRIORITY:
+                if not cs.constrains(attr):
+                    self.unconstrained[attr].add(i)
+                    continue
+
+                self.constrained[attr].add(i)
+                if attr == 'type':
+                    self.index[attr].setdefault(cs.type, set()).add(i)
+                elif attr in cs.values:
+                    for val in cs.values[attr]:
+                        self.index[attr].setdefault(val, set()).add(i)
+                elif attr == 'genre':
+                    for val in cs.genres:
+                        self.index[attr].setdefault(val, set()).add(i)
+
+    def _scores(self, attr, fv, candidates):
+        scores = {}
+        index = self.index[attr]
+        if attr == 'type':
+            for i in index.get(fv.is3D and '3D' or '2D', ()):
+                scores[i] = 5
+        elif attr in ('studio', 'director', 'actor', 'tags'):
+            for val in fv.values[attr]:
+                for i in index.get(val, ()):
+                    scores[i] = 5
+        elif attr == 'genre':
+            for g, val in zip(fv.genres, CompiledSequence.GENRE_SCORES):
+                for i in index.get(g, ()):
+                    scores[i] = scores.get(i, 0) + val
+        else:
+            for i in self.constrained[attr] & candidates:
+                if self.sequences[i].matchesRange(attr, fv):
+                    scores[i] = 5
+
+        return scores
+
+    # Returns [(SequenceData, score), ...] for the sequences matching every condition, in sequence order
+    def matches(self, feature):
+        fv = FeatureValues(feature)
+        candidates = set(range(len(self.sequences)))
+        totals = dict.fromkeys(candidates, 0)
+
+        for attr in self.PRIORITY:
+            scores = self._scores(attr, fv, candidates)
+            candidates = (candidates & self.unconstrained[attr]) | (candidates & set(scores))
+            for i in candidates:
+                totals[i] += scores.get(i, 0)
+
+            if not candidates:
+                break
+
+        return [(self.sequences[i].sequence, totals[i]) for i in sorted(candidates)]
+
+    def match(self, feature):
+        matches = self.matches(feature)
+        if not matches:
+            return None
+        return max(matches, key=lambda x: x[1])[0]
+
+
 ################################################################################
 # BASE class for all content items
 ################################################################################
@@ -1,7 +1,10 @@
 import os
+import bisect
+import math
 import random
 import re
 import time
+import threading
 import datetime
 import database as DB
 import sequence
@@ -95,6 +98,40 @@ class Song(Playable):
         return int(self['duration'])
 
 
+# The songs for a trivia queue, played in order and cycled until the queue's duration is covered.
+# Stored as the songs plus the number of plays instead of a list with every repeat.
+class MusicSchedule(object):
+    def __init__(self, songs, duration):
+        self.songs = songs
+        self.count = len(songs)
+
+        cycle = sum([s.duration for s in songs])
+        if not cycle:  # Maybe they were all zero - we'd be here forever :)
+            return
+
+        total = cycle
+        if total < duration:  # Whole cycles short of the duration, the loop below plays into the last one
+            repeats = int(math.ceil(float(duration - total) / cycle)) - 1
+            self.count += repeats * len(songs)
+            total += repeats * cycle
+
+        while total < duration:
+            total += songs[self.count % len(songs)].duration
+            self.count += 1
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, idx):
+        if idx < 0 or idx >= self.count:
+            raise IndexError(idx)
+        return self.songs[idx % len(self.songs)]
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self.songs[i % len(self.songs)]
+
+
 class ImageQueue(PlayableQueue):
     type = 'IMAGE.QUEUE'
 
@@ -110,22 +147,20 @@ class ImageQueue(PlayableQueue):
         self.musicVolume = 85
         self.musicFadeIn = 3.0
         self.musicFadeOut = 3.0
+        self.queue = self.get('queue', [])
 
     def __iadd__(self, other):
-        for o in other:
-            self.duration += o.duration
-
-        self.queue += other
+        self.duration += sum([o.duration for o in other])
+        self._extend(other)
         return self
 
     def __contains__(self, images):
-        paths = [i.path for i in self.queue]
         if isinstance(images, list):
             for i in images:
-                if i.path in paths:
+                if i.path in self._paths:
                     return True
         else:
-            return images.path in paths
+            return images.path in self._paths
 
         return False
 
@@ -148,17 +183,32 @@ class ImageQueue(PlayableQueue):
 
     @property
     def queue(self):
-        return self.get('queue', [])
+        return self['queue']
 
     @queue.setter
     def queue(self, q):
-        self['queue'] = q
+        self['queue'] = []
+        self._paths = set()
+        self._setIDs = set()
+        self._setEnds = []  # Sorted queue positions of the last slide of each set
+        self._extend(q)
+
+    def _extend(self, images):
+        for image in images:
+            if not image.setNumber:
+                self._setEnds.append(len(self['queue']))
+            self['queue'].append(image)
+            self._paths.add(image.path)
+            self._setIDs.add(image.setID)
+
+    def hasSet(self, set_id):
+        return set_id in self._setIDs
 
     def current(self):
         return self.queue[self.pos]
 
     def add(self, image):
-        self.queue.append(image)
+        self._extend([image])
 
     def next(self, start=0, count=1, extend=False):
         overtime = start and time.time() - start >= self.maxDuration
@@ -169,16 +219,14 @@ class ImageQueue(PlayableQueue):
             self.pos += self.current().setNumber  # Move to the end of the current set
 
             for c in range(count - 1):
-                while True:
-                    if self.pos >= self.size() - 1:  # We need more slides
-                        if not self._next():
-                            break
-                    else:
-                        self.pos += 1
-
-                    if not self.current().setNumber:  # We're at the end of a set
+                last = self.pos
+                if self.pos >= self.size() - 1:  # We need more slides
+                    if not self._next():
                         break
 
+                idx = bisect.bisect_right(self._setEnds, last)  # Move to the end of the next set
+                self.pos = idx < len(self._setEnds) and self._setEnds[idx] or self.size() - 1
+
         if self.pos >= self.size() - 1:
             if extend or not overtime:
                 return self._next()
@@ -197,7 +245,7 @@ class ImageQueue(PlayableQueue):
             return None
 
         util.DEBUG_LOG('ImageQueue: {0} returned'.format(len(images)))
-        self.queue += images
+        self._extend(images)
         self.pos += 1
 
         return self.current()
@@ -207,13 +255,9 @@ class ImageQueue(PlayableQueue):
             return None
 
         if count > 1:
-            for c in range(count + 1):
-                while self.pos > -1:
-                    self.pos -= 1
-                    if not self.current().setNumber:  # We're at the end of a set
-                        break
-
-            self.pos += 1
+            # Back up past count + 1 set ends and land on the first slide of the following set
+            idx = bisect.bisect_left(self._setEnds, self.pos) - (count + 1)
+            self.pos = idx >= 0 and self._setEnds[idx] + 1 or 0
 
             return self.current()
 
@@ -550,7 +594,8 @@ class FeatureHandler:
 
 class TriviaHandler:
     def __init__(self):
-        pass
+        self._watched = {}
+        self._watchedLock = threading.Lock()
 
     def __call__(self, caller, sItem):
         duration = sItem.getLive('duration')
@@ -592,19 +637,18 @@ class TriviaHandler:
             return
 
         if mode == 'content':
-            queue.music = [Song(s.path, s.duration) for s in DB.Song.select().order_by(DB.fn.Random())]
+            songs = [Song(s.path, s.duration) for s in DB.Song.select().order_by(DB.fn.Random())]
         elif mode == 'dir':
             path = sItem.getLive('musicDir')
             if not path:
                 return
 
-            import mutagen
-            mutagen.setFileOpener(util.vfs.File)
+            mutagen = util.importMutagen()
 
-            queue.music = []
+            songs = []
             for p in util.listFilePaths(path):
                 try:
-                    data = mutagen.File(p)
+                    data = mutagen.FileByExtension(p, info_only=True)
                 except:
                     data = None
                     util.ERROR()
@@ -612,33 +656,23 @@ class TriviaHandler:
                 d = 0
                 if data:
                     d = data.info.length
-                queue.music.append(Song(p, d))
+                songs.append(Song(p, d))
 
-            random.shuffle(queue.music)
+            random.shuffle(songs)
         elif mode == 'file':
             path = sItem.getLive('musicFile')
             if not path:
                 return
 
-            import mutagen
-            mutagen.setFileOpener(util.vfs.File)
+            mutagen = util.importMutagen()
 
-            data = mutagen.File(path)
+            data = mutagen.FileByExtension(path, info_only=True)
             d = 0
             if data:
                 d = data.info.length
-            queue.music = [Song(path, d)]
-
-        duration = sum([s.duration for s in queue.music])
+            songs = [Song(path, d)]
 
-        if duration:  # Maybe they were all zero - we'll be here forever :)
-            while duration < queue.duration:
-                for i in range(len(queue.music)):
-                    song = queue.music[i]
-                    duration += song.duration
-                    queue.music.append(song)
-                    if duration >= queue.duration:
-                        break
+        queue.music = MusicSchedule(songs, queue.duration)
 
         queue.musicVolume = util.getSettingDefault('trivia.musicVolume')
         queue.musicFadeIn = util.getSettingDefault('trivia.musicFadeIn')
@@ -663,17 +697,14 @@ class TriviaHandler:
                 if trivia.type == 'video':
                     continue
 
-            try:
-                DB.WatchedTrivia.get((DB.WatchedTrivia.WID == trivia.TID) & DB.WatchedTrivia.watched)
-            except DB.peewee.DoesNotExist:
+            if not DB.triviaWatched(trivia.TID):
                 yield self.createTriviaImages(sItem, trivia, durations)
 
         # Grab the oldest 4 trivias, shuffle and yield... repeat
         pool = []
         for watched in DB.WatchedTrivia.select().where(DB.WatchedTrivia.watched).order_by(DB.WatchedTrivia.date):
-            try:
-                trivia = DB.Trivia.get(DB.Trivia.TID == watched.WID)
-            except DB.peewee.DoesNotExist:
+            trivia = DB.getTrivia(watched.WID)
+            if not trivia:
                 continue
 
             if useVideo:
@@ -718,17 +749,39 @@ class TriviaHandler:
 
     def next(self, image_queue):
         for slides in self.getTriviaImages(image_queue.sItem):
-            if slides not in image_queue:
+            if isinstance(slides, Video):
+                continue
+
+            if slides and not image_queue.hasSet(slides[0].setID) and slides not in image_queue:
                 return slides
         return None
 
-    @DB.sessionW
+    # Marks are held until flushWatched() so a queue is written in one transaction instead of one per slide
     def mark(self, image):
-        trivia = DB.WatchedTrivia.get_or_create(WID=image.setID)[0]
-        trivia.update(
-            watched=True,
-            date=datetime.datetime.now()
-        ).where(DB.WatchedTrivia.WID == image.setID).execute()
+        with self._watchedLock:
+            self._watched[image.setID] = datetime.datetime.now()
+
+    def flushWatched(self):
+        with self._watchedLock:
+            watched, self._watched = self._watched, {}
+
+        if watched:
+            util.DEBUG_LOG('Trivia: Saving watched status for {0} trivia'.format(len(watched)))
+            try:
+                self._saveWatched(watched)
+            except Exception:
+                # The write is one transaction, so none were saved. Keep them for the next flush,
+                # marks made since take precedence.
+                with self._watchedLock:
+                    watched.update(self._watched)
+                    self._watched = watched
+                raise
+
+    @DB.sessionW
+    def _saveWatched(self, watched):
+        for WID, date in watched.items():
+            if not DB.WatchedTrivia.update(watched=True, date=date).where(DB.WatchedTrivia.WID == WID).execute():
+                DB.WatchedTrivia.create(WID=WID, watched=True, date=date)
 
 
 class TrailerHandler:
@@ -916,9 +969,7 @@ class TrailerHandler:
             ct = 0
 
             for t in trailers:
-                try:
-                    DB.Trailers.get(DB.Trailers.WID == t.ID)
-                except DB.peewee.DoesNotExist:
+                if not DB.trailerExists(t.ID):
                     ct += 1
                     url = t.getStaticURL()
                     DB.Trailers.create(
@@ -1283,6 +1334,11 @@ class SequenceProcessor:
     def ratings(self):
         return [feature.rating for feature in self.featureQueue if feature.rating]
 
+    def flushWatched(self):
+        for handler in self.handlers.values():
+            if hasattr(handler, 'flushWatched'):
+                handler.flushWatched()
+
     def commandHandler(self, sItem):
         if sItem.condition == 'feature.queue=full' and not self.featureQueue:
             return 0
@@ -1,6 +1,7 @@
 import os
 import sys
 import re
+import collections
 
 DEBUG = True
 
@@ -37,6 +38,142 @@ class Progress:
         return True
 
 
+BLOCK_SIZE = 32768
+BLOCK_READ_AHEAD = 1  # Extra blocks fetched after a miss that continues the previous read
+BLOCK_CACHE_MAX = 64
+
+
+# Read only file object over another file that reads it in blocks and keeps the most recently used ones.
+# Metadata parsers do lots of small seeks and reads, which over network shares is a round trip each.
+class BlockCachedFile(object):
+    def __init__(self, raw, size=None, block_size=None, read_ahead=None, max_blocks=None):
+        self.raw = raw
+        self.blockSize = block_size or BLOCK_SIZE
+        self.readAhead = BLOCK_READ_AHEAD if read_ahead is None else read_ahead
+        self.maxBlocks = max(max_blocks or BLOCK_CACHE_MAX, self.readAhead + 1)
+        self.rawReads = 0
+        self.rawBytes = 0
+        self._blocks = collections.OrderedDict()
+        self._pos = 0
+        self._nextBlock = 0
+
+        if size is None:
+            raw.seek(0, 2)
+            size = raw.tell()
+        self._size = size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._blocks.clear()
+        self.raw.close()
+
+    def flush(self):
+        pass
+
+    def size(self):
+        return self._size
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            offset += self._pos
+        elif whence == 2:
+            offset += self._size
+
+        if offset < 0:
+            raise IOError(22, 'Invalid argument')
+
+        self._pos = offset
+        return offset
+
+    def write(self, data):
+        raise IOError(9, 'File not open for writing')
+
+    def _rawRead(self, start, length):
+        self.raw.seek(start, 0)
+        chunks = []
+        while length > 0:
+            data = self.raw.read(length)
+            self.rawReads += 1
+            if not data:
+                break
+            chunks.append(data)
+            length -= len(data)
+        data = b''.join(chunks)
+        self.rawBytes += len(data)
+        return data
+
+    def _fetch(self, first, last):
+        lastBlock = (self._size - 1) // self.blockSize
+        block = first
+        while block <= last:
+            if block in self._blocks:
+                self._blocks[block] = self._blocks.pop(block)  # Keep it from being evicted below
+                block += 1
+                continue
+
+            # Read the run of missing blocks plus read ahead in one go
+            end = block
+            while end < last and end + 1 not in self._blocks:
+                end += 1
+            # Read ahead only for sequential reads, sampling a file here and there shouldn't pull in extra blocks
+            ahead = 0
+            while block == self._nextBlock and ahead < self.readAhead and end < lastBlock and end + 1 not in self._blocks:
+                end += 1
+                ahead += 1
+
+            data = self._rawRead(block * self.blockSize, (end - block + 1) * self.blockSize)
+            self._nextBlock = end + 1
+            for i in range(end - block + 1):
+                self._blocks[block + i] = data[i * self.blockSize:(i + 1) * self.blockSize]
+
+            block = end + 1
+
+        while len(self._blocks) > self.maxBlocks:
+            self._blocks.popitem(last=False)
+
+    def read(self, nbytes=-1):
+        if nbytes is None or nbytes < 0:
+            nbytes = self._size - self._pos
+        else:
+            nbytes = min(nbytes, self._size - self._pos)
+
+        if nbytes <= 0:
+            return b''
+
+        start = self._pos
+        if nbytes > self.blockSize * (self.maxBlocks // 2):  # Too big to be worth caching
+            data = self._rawRead(start, nbytes)
+            self._pos += len(data)
+            return data
+
+        first = start // self.blockSize
+        last = (start + nbytes - 1) // self.blockSize
+        if last > first or first not in self._blocks:
+            self._fetch(first, last)
+
+        chunks = []
+        for block in range(first, last + 1):
+            data = self._blocks.get(block)
+            if data is None:  # Evicted while fetching a range larger than the cache
+                data = self._rawRead(block * self.blockSize, self.blockSize)
+            else:
+                self._blocks[block] = self._blocks.pop(block)  # Most recently used
+            chunks.append(data)
+
+        offset = start - first * self.blockSize
+        data = b''.join(chunks)[offset:offset + nbytes]
+        self._pos += len(data)
+        return data
+
+
 def getSep(path):
     if '\\' not in path:
         return '/'
@@ -102,6 +239,7 @@ try:
     import time
 
     STORAGE_PATH = xbmc.translatePath(xbmcaddon.Addon().getAddonInfo('profile')).decode('utf-8')
+    MULTIPROCESSING = False  # Kodi's embedded interpreter can't run worker processes
     _T = xbmcaddon.Addon().getLocalizedString
 
     def T(ID, eng=''):
@@ -137,13 +275,11 @@ try:
                 if nbytes == 0:
                     return ''
                 elif nbytes < 0:
-                    nbytes = 0
+                    nbytes = 0  # Reads the rest of the file
 
-                self._pos += nbytes
-                if self._pos >= self._size or not nbytes:
-                    self._pos = self._size - 1
-
-                return xbmcvfs.File.read(self, nbytes)
+                data = xbmcvfs.File.read(self, nbytes)
+                self._pos += len(data)
+                return data
 
             def write(self, data):
                 self._pos += len(data)
@@ -151,12 +287,20 @@ try:
                 return xbmcvfs.File.write(self, data)
 
             def seek(self, offset, whence=0):
-                if whence == 0:
-                    self._pos = 0
+                if whence == 1:
+                    offset += self._pos
                 elif whence == 2:
-                    self._pos = self._size - 1
-                self._pos += offset
-                return xbmcvfs.File.seek(self, offset, whence)
+                    offset += self._size
+                xbmcvfs.File.seek(self, offset, 0)
+                self._pos = offset
+                return offset
+
+        # For the metadata parsers. Writing modes get a plain File
+        def BufferedFile(self, path, mode='rb', **kwargs):
+            f = self.File(path, mode)
+            if 'r' not in mode or '+' in mode:
+                return f
+            return BlockCachedFile(f, f._size, **kwargs)
 
     vfs = VFS()
 
@@ -175,6 +319,9 @@ try:
         vstat = xbmcvfs.Stat(path)
         return stat.S_ISDIR(vstat.st_mode())
 
+    def mtime(path):
+        return xbmcvfs.Stat(path).st_mtime()
+
     def translatePath(path):
         if path.startswith('special://'):
             return xbmc.translatePath(path)
@@ -267,6 +414,7 @@ except:
     import zipfile
 
     STORAGE_PATH = '~'
+    MULTIPROCESSING = os.name == 'posix'  # Forked workers inherit sys.path and the vfs setup
 
     def T(ID, eng=''):
         return eng
@@ -317,6 +465,14 @@ except:
 
     vfs.File = File
 
+    def BufferedFile(path, mode='rb', **kwargs):
+        f = File(path, mode)
+        if 'r' not in mode or '+' in mode or isinstance(f, InsideZipFile):
+            return f
+        return BlockCachedFile(f, **kwargs)
+
+    vfs.BufferedFile = BufferedFile
+
     def listdir(path):
         if path.lower().endswith('.zip'):
             z = zipfile.ZipFile(path, 'r')
@@ -333,6 +489,12 @@ except:
     def isDir(path):
         return os.path.isdir(path)
 
+    def mtime(path):
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return 0
+
     def translatePath(path):
         return path
 
@@ -364,6 +526,14 @@ def listFilePaths(path):
     return ret
 
 
+# mutagen is imported where it's used to keep startup fast. Import it through here so its file opener,
+# which hachoir also reads through, is always set to the VFS before anything is opened.
+def importMutagen():
+    import mutagen
+    mutagen.setFileOpener(vfs.BufferedFile)
+    return mutagen
+
+
 def strRepr(str_obj):
     ret = repr(str_obj).lstrip('u')
     return ret.endswith('"') and ret.strip('"') or ret.strip("'")
@@ -147,24 +147,31 @@ def getActiveSequences(active=True, for_dialog=False):
         return None
 
     sequencesPath = cinemavision.util.pathJoin(contentPath, 'Sequences')
-    sequencePaths = [cinemavision.util.pathJoin(sequencesPath, p) for p in cinemavision.util.vfs.listdir(sequencesPath)]
 
     sequences = []
-    for p in sequencePaths:
-        try:
-            s = cinemavision.sequence.SequenceData.load(p)
-            if not active or (s and s.active):
-                if not for_dialog or s.visibleInDialog():
-                    sequences.append(s)
-        except Exception:
-            kodiutil.ERROR('Failed to load: {0}'.format(kodiutil.strRepr(p)))
+    for s in cinemavision.sequence.LIBRARY.sequences(sequencesPath):
+        if not active or (s and s.active):
+            if not for_dialog or s.visibleInDialog():
+                sequences.append(s)
 
     return sequences
 
 
-def getMatchedSequence(feature):
-    priority = ['type', 'ratings', 'year', 'studio', 'director', 'actor', 'genre', 'tags', 'dates', 'times']
+_MATCHER = None
+
+
+def getSequenceMatcher(sequences):
+    global _MATCHER
+
+    # Sequences come from the library's cache, so the same objects mean nothing has changed
+    key = [id(s) for s in sequences]
+    if not _MATCHER or _MATCHER[0] != key:
+        _MATCHER = (key, cinemavision.sequence.SequenceMatcher(sequences))
 
+    return _MATCHER[1]
+
+
+def getMatchedSequence(feature):
     contentPath = getSequencesContentPath()
     if not contentPath:
         return getDefaultSequenceData(feature)
@@ -182,17 +189,7 @@ def getMatchedSequence(feature):
 
     kodiutil.DEBUG_LOG(out)
 
-    matches = [[s, 0] for s in sequences]
-    for attr in priority:
-        for seq in matches[:]:
-            match = seq[0].matchesFeatureAttr(attr, feature)
-            if match >= 0:
-                seq[1] += match
-            else:
-                matches.remove(seq)
-
-        if not matches:
-            break
+    matches = getSequenceMatcher(sequences).matches(feature)
 
     if matches:
         out = 'MATCHES: '
@@ -203,14 +200,14 @@ def getMatchedSequence(feature):
         seqData = None
 
     kodiutil.DEBUG_LOG('.')
-    kodiutil.DEBUG_LOG('CHOICE: {0}'.format(seqData.name))
+    kodiutil.DEBUG_LOG('CHOICE: {0}'.format(seqData and seqData.name))
     kodiutil.DEBUG_LOG('.')
     kodiutil.DEBUG_LOG(feature)
 
     if not seqData:
         return getDefaultSequenceData(feature)
 
-    path = cinemavision.util.pathJoin(sequencesPath, '{0}.cvseq'.format(seqData.name))
+    path = cinemavision.util.pathJoin(sequencesPath, '{0}.cvseq'.format(seqData.pathName))
     return {'path': path, 'sequence': seqData}
 
 def getDefaultSequenceData(feature):
@@ -255,7 +252,10 @@ def loadContent(from_settings=False, bg=False):
     kodiutil.DEBUG_LOG('Loading content...')
 
     with kodiutil.Progress(T(32505, 'Loading Content'), bg=bg) as p:
-        cinemavision.content.UserContent(contentPath, callback=p.msg, trailer_sources=kodiutil.getSetting('trailer.scrapers', '').split(','))
+        cinemavision.content.UserContent(
+            contentPath, callback=p.msg, trailer_sources=kodiutil.getSetting('trailer.scrapers', '').split(','),
+            workers=kodiutil.getSetting('content.import.workers', 0)
+        )
 
     createSettingsRSDirs()
 
@@ -272,7 +272,7 @@ def createSettingsRSDirs():
 
     defaultSystem = kodiutil.getSetting('rating.system.default', 'MPAA')
 
-    for system in cinemavision.ratings.RATINGS_SYSTEMS.values():
+    for system in cinemavision.ratings.getSystems():
         systemPaths = [os.path.join(base, system.name)]
         if system.name == defaultSystem:
             systemPaths.append(defaultPath)
@@ -432,27 +432,14 @@ def ratingParser():
 
 
 class RatingParser:
-    SYSTEM_RATING_REs = {
-        # 'MPAA': r'(?i)^Rated\s(?P<rating>Unrated|NR|PG-13|PG|G|R|NC-17)',
-        'BBFC': r'(?i)^UK(?:\s+|:)(?P<rating>Uc|U|12A|12|PG|15|R18|18)',
-        'FSK': r'(?i)^(?:FSK|Germany)(?:\s+|:)(?P<rating>0|6|12|16|18|Unrated)',
-        'DEJUS': r'(?i)(?P<rating>Livre|10 Anos|12 Anos|14 Anos|16 Anos|18 Anos)'
-    }
-
-    RATING_REs = {
-        'MPAA': r'(?i)(?P<rating>Unrated|NR|PG-13|PG|G|R|NC-17)',
-        'BBFC': r'(?i)(?P<rating>Uc|U|12A|12|PG|15|R18|18)',
-        'FSK': r'(?i)(?P<rating>0|6|12|16|18|Unrated)',
-        'DEJUS': r'(?i)(?P<rating>Livre|10 Anos|12 Anos|14 Anos|16 Anos|18 Anos)'
-    }
-
-    SYSTEM_RATING_REs.update(cinemavision.ratings.getRegExs('kodi'))
-    RATING_REs.update(cinemavision.ratings.getRegExs())
+    CACHE_MAX = 1000
 
     LANGUAGE = xbmc.getLanguage(xbmc.ISO_639_1, region=True)
 
     def __init__(self):
         kodiutil.DEBUG_LOG('Language: {0}'.format(self.LANGUAGE))
+        self._generation = None
+        self._cache = {}
         self.setRatingDefaults()
 
     def setRatingDefaults(self):
@@ -470,6 +457,16 @@ class RatingParser:
         else:
             cinemavision.ratings.setDefaultRatingSystem(ratingSystem)
 
+    # Rebuilds the expressions and drops memoized results when the rating systems have changed
+    def _compile(self):
+        if self._generation == cinemavision.ratings.GENERATION:
+            return
+
+        self._systemRE, self._ratingRE, ratingREs = cinemavision.ratings.getParseRegExs()
+        self._ratingREs = dict((system, re.compile(ratingRE)) for system, ratingRE in ratingREs.items())
+        self._cache = {}
+        self._generation = cinemavision.ratings.GENERATION
+
     def getActualRatingFromMPAA(self, rating, debug=False):
         if debug:
             kodiutil.DEBUG_LOG('Rating from Kodi: {0}'.format(kodiutil.strRepr(rating)))
@@ -477,26 +474,35 @@ class RatingParser:
         if not rating:
             return 'UNKNOWN:NR'
 
+        self._compile()
+
+        ret = self._cache.get(rating)
+        if ret is None:
+            if len(self._cache) >= self.CACHE_MAX:
+                self._cache = {}
+            ret = self._cache[rating] = self._parse(rating)
+
+        return ret
+
+    def _parse(self, rating):
         # Try a definite match
-        for system, ratingRE in self.SYSTEM_RATING_REs.items():
-            m = re.search(ratingRE, rating)
-            if m:
-                return '{0}:{1}'.format(system, m.group('rating'))
+        system, match = self._systemRE.search(rating)
+        if system:
+            return '{0}:{1}'.format(system, match)
 
         rating = rating.upper().replace('RATED', '').strip(': ')
 
         # Try to match against default system if set
         defaultSystem = cinemavision.ratings.DEFAULT_RATING_SYSTEM
-        if defaultSystem and defaultSystem in self.RATING_REs:
-            m = re.search(self.RATING_REs[defaultSystem], rating)
+        if defaultSystem and defaultSystem in self._ratingREs:
+            m = self._ratingREs[defaultSystem].search(rating)
             if m:
                 return '{0}:{1}'.format(defaultSystem, m.group('rating'))
 
         # Try to extract rating from know ratings systems
-        for system, ratingRE in self.RATING_REs.items():
-            m = re.search(ratingRE, rating)
-            if m:
-                return m.group('rating')
+        system, match = self._ratingRE.search(rating)
+        if system:
+            return match
 
         # Just return what we have
         return rating
@@ -1,13 +1,18 @@
 import os
+import math
 import re
 import time
 import threading
 import json
+import hashlib
+import Queue
+from collections import OrderedDict
 
 import xbmc
 import xbmcgui
 
 from kodijsonrpc import rpc
+from scheduler import Scheduler
 
 import kodigui
 import kodiutil
@@ -69,16 +74,92 @@ def resolveURLFile(path):
     return vid.streamURL()
 
 
+def _curveLinear(pos):
+    return pos
+
+
+def _curveLog(pos):
+    return math.log10(1 + 9 * pos)
+
+
+def _curveS(pos):
+    return pos * pos * (3 - 2 * pos)
+
+
+FADE_CURVES = {
+    'linear': _curveLinear,
+    'log': _curveLog,
+    'scurve': _curveS
+}
+
+
+# Precomputes (offset seconds, volume) steps for a fade. Steps that would not change the
+# integer volume are dropped so only real changes get sent to SetVolume.
+def fadeSteps(start, end, duration, curve='linear', step_rate=20):
+    func = FADE_CURVES.get(curve, _curveLinear)
+    count = max(int(duration * step_rate), 1)
+    steps = []
+    last = start
+    for i in range(1, count + 1):
+        pos = i / float(count)
+        vol = int(round(start + (end - start) * func(pos)))
+        if vol != last:
+            steps.append((duration * pos, vol))
+            last = vol
+
+    if not steps or steps[-1][1] != end:
+        steps.append((duration, end))
+
+    return steps
+
+
+class FadeJob:
+    def __init__(self, steps, paused=False):
+        self.steps = steps
+        self.cancelled = threading.Event()
+        self.changed = threading.Event()  # Wakes the fader early for a cancel, pause or resume
+        self.started = time.time()
+        self.pausedAt = paused and self.started or None
+        self.pausedTotal = 0
+
+    def pause(self):
+        if self.pausedAt is None:
+            self.pausedAt = time.time()
+            self.changed.set()
+
+    def resume(self):
+        if self.pausedAt is not None:
+            self.pausedTotal += time.time() - self.pausedAt
+            self.pausedAt = None
+            self.changed.set()
+
+    def paused(self):
+        return self.pausedAt is not None
+
+    def elapsed(self):
+        return (self.pausedAt or time.time()) - self.started - self.pausedTotal
+
+
 class KodiVolumeControl:
-    def __init__(self, abort_flag):
+    ABORT_CHECK_INTERVAL = 1  # Longest the fader sleeps without checking for a Kodi shutdown
+
+    def __init__(self, abort_flag, scheduler=None, curve='linear', step_rate=20):
         self.saved = None
         self.abortFlag = abort_flag
-        self._stopFlag = False
+        self.scheduler = scheduler
+        self.curve = curve
+        self.stepRate = max(step_rate, 1)
+        self._volume = None  # Last volume we know of, so fades don't need a JSON-RPC round-trip
+        self._paused = False
+        self._job = None
         self._fader = None
+        self._lock = threading.Lock()
         self._restoring = False
 
     def current(self):
-        return rpc.Application.GetProperties(properties=['volume'])['volume']
+        if self._volume is None:
+            self._volume = rpc.Application.GetProperties(properties=['volume'])['volume']
+        return self._volume
 
     def fading(self):
         if not self._fader:
@@ -87,14 +168,16 @@ class KodiVolumeControl:
         return self._fader.isAlive()
 
     def _set(self, volume):
+        self._volume = volume
         xbmc.executebuiltin("XBMC.SetVolume({0})".format(volume))
         # rpc.Application.SetVolume(volume=volume)  # This works but displays the volume indicator :(
 
     def store(self):
-        if self.saved:
-            return
-
-        self.saved = self.current()
+        last = self._volume
+        self._volume = None  # Re-read it, the user may have changed the volume since we last set it
+        volume = self.current()
+        if self.saved is None or (volume != last and not self.fading()):
+            self.saved = volume
 
     def restore(self, delay=0):
         if self._restoring:
@@ -110,7 +193,9 @@ class KodiVolumeControl:
 
             DEBUG_LOG('Restoring volume to: {0}'.format(self.saved))
 
-            self._set(self.saved)
+            with self._lock:
+                self._cancel()
+                self._set(self.saved)
             self.saved = None
         finally:
             self._restoring = False
@@ -125,54 +210,236 @@ class KodiVolumeControl:
             DEBUG_LOG('Setting volume to: {0}'.format(volume))
 
         if fade_time:
-            current = self.current()
-            self._fade(current, volume, fade_time)
+            self._fade(self.current(), volume, fade_time)
         else:
-            self._set(volume)
+            with self._lock:
+                self._cancel()
+                self._set(volume)
 
     def stop(self):
-        self._stopFlag = True
+        with self._lock:
+            self._cancel()
 
-    def _stop(self):
-        if self._stopFlag:
-            self._stopFlag = False
-            return True
-        return False
+    # Called from the player's pause/resume callbacks so fades hold their position while paused
+    def pause(self):
+        self._paused = True
+        job = self._job
+        if job:
+            job.pause()
+
+    def resume(self):
+        self._paused = False
+        job = self._job
+        if job:
+            job.resume()
+
+    # Called when playback stops or ends, there is nothing left to fade
+    def stopped(self):
+        self._paused = False
+        self.stop()
+
+    def _cancel(self):
+        if self._job:
+            self._job.cancelled.set()
+            self._job.changed.set()
+            self._job = None
 
     def _fade(self, start, end, fade_time_millis):
-        if self.fading():
-            self.stop()
-            self._fader.join()
-        self._fader = threading.Thread(target=self._fadeWorker, args=(start, end, fade_time_millis))
+        steps = fadeSteps(start, end, fade_time_millis / 1000.0, self.curve, self.stepRate)
+        job = FadeJob(steps, self._paused)
+        with self._lock:
+            # The old fader sees its job cancelled on its next step and exits on its own
+            self._cancel()
+            self._job = job
+        self._fader = threading.Thread(target=self._fadeThread, args=(job,), name='VOLUME-FADER')
         self._fader.start()
 
-    def _fadeWorker(self, start, end, fade_time_millis):
-        volWidth = end - start
+    def _fadeThread(self, job):
+        try:
+            self._fadeWorker(job)
+        finally:
+            if self.scheduler:
+                self.scheduler.wake()
 
-        func = end > start and min or max
+    def _aborted(self, job):
+        return job.cancelled.isSet() or self.abortFlag.isSet() or xbmc.abortRequested
 
-        duration = fade_time_millis / 1000.0
-        endTime = time.time() + duration
-        vol = start
-        left = duration
+    def _fadeWorker(self, job):
+        vol = job.steps[0][1]
 
-        DEBUG_LOG('Fade: START ({0}) - {1}ms'.format(start, fade_time_millis))
-        while time.time() < endTime and not kodiutil.wait(0.1):
-            while xbmc.getCondVisibility('Player.Paused') and not kodiutil.wait(0.1):
-                endTime = time.time() + left
+        DEBUG_LOG('Fade: START ({0} steps) - {1:.1f}s'.format(len(job.steps), job.steps[-1][0]))
+        for offset, vol in job.steps:
+            while True:
+                job.changed.clear()
+                if self._aborted(job):
+                    DEBUG_LOG('Fade ended early({0}): ABORT'.format(self._volume))
+                    return
 
-            if xbmc.abortRequested or not xbmc.getCondVisibility('Player.Playing') or self.abortFlag.isSet() or self._stop():
-                DEBUG_LOG(
-                    'Fade ended early({0}): {1}'.format(vol, not xbmc.getCondVisibility('Player.Playing') and 'NOT_PLAYING' or 'ABORT')
-                )
-                return
-            left = endTime - time.time()
-            vol = func(end, int(start + (((duration - left) / duration) * volWidth)))
-            self._set(vol)
+                left = offset - job.elapsed()
+                if left <= 0:
+                    break
+
+                # There is only a step where the volume changes, so sleep until it is due
+                job.changed.wait(job.paused() and self.ABORT_CHECK_INTERVAL or min(left, self.ABORT_CHECK_INTERVAL))
+
+            with self._lock:
+                if job.cancelled.isSet():
+                    DEBUG_LOG('Fade ended early({0}): CANCELLED'.format(self._volume))
+                    return
+                self._set(vol)
+
+        with self._lock:
+            if self._job is job:
+                self._job = None
 
         DEBUG_LOG('Fade: END ({0})'.format(vol))
 
 
+# Copies upcoming slides from network sources to a local, size capped LRU cache so they
+# can be shown without waiting on the network when they come up
+class SlideCache:
+    def __init__(self, size_mb=100, look_ahead=5):
+        self.path = os.path.join(kodiutil.PROFILE_PATH, 'slide_cache')
+        self.maxSize = size_mb * 1024 * 1024
+        self.lookAhead = look_ahead
+        self.size = 0
+        self._entries = OrderedDict()  # Cache file name -> size, least recently used first
+        self._names = {}  # Source path -> cache file name for the size and mtime it had when last checked
+        self._lock = threading.Lock()
+        self._pending = Queue.Queue()
+        self._queued = set()
+        self._stopFlag = threading.Event()
+        self._thread = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+            return
+
+        files = []
+        for name in os.listdir(self.path):
+            full = os.path.join(self.path, name)
+            if name.endswith('.tmp'):
+                os.remove(full)
+                continue
+            st = os.stat(full)
+            files.append((st.st_atime, name, st.st_size))
+
+        for atime, name, size in sorted(files):
+            self._entries[name] = size
+            self.size += size
+
+        self._evict()
+
+    def _cacheName(self, path, size, mtime):
+        # Size and mtime are part of the name so a slide replaced at the same path is fetched again
+        if isinstance(path, unicode):
+            path = path.encode('utf-8')
+        return hashlib.md5('{0}|{1}|{2}'.format(path, size, mtime)).hexdigest() + os.path.splitext(path)[-1].lower()
+
+    def isRemote(self, path):
+        return '://' in path
+
+    def get(self, path):
+        if not path or not self.isRemote(path):
+            return path
+
+        with self._lock:
+            name = self._names.get(path)
+            if name not in self._entries:
+                return path
+            self._entries[name] = self._entries.pop(name)
+
+        local = os.path.join(self.path, name)
+        try:
+            os.utime(local, None)
+        except OSError:
+            return path
+
+        return local
+
+    def prefetch(self, image_queue):
+        start = max(image_queue.pos, 0)
+        for image in image_queue.queue[start:start + self.lookAhead + 1]:
+            self.add(image.path)
+
+    def add(self, path):
+        if not path or not self.isRemote(path):
+            return
+
+        with self._lock:
+            if self._names.get(path) in self._entries or path in self._queued:
+                return
+            self._queued.add(path)
+
+        self._pending.put(path)
+        self.start()
+
+    def start(self):
+        self._stopFlag.clear()
+        if self._thread and self._thread.isAlive():
+            return
+
+        self._thread = threading.Thread(target=self._worker, name='SLIDE-CACHE')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stopFlag.set()
+
+    def _worker(self):
+        import xbmcvfs
+
+        while not self._stopFlag.isSet() and not xbmc.abortRequested:
+            try:
+                path = self._pending.get(timeout=1)
+            except Queue.Empty:
+                continue
+
+            try:
+                st = xbmcvfs.Stat(path)
+                name = self._cacheName(path, st.st_size(), st.st_mtime())
+                with self._lock:
+                    self._names[path] = name
+                    if name in self._entries:
+                        continue
+
+                local = os.path.join(self.path, name)
+                tmp = local + '.tmp'
+                if xbmcvfs.copy(path, tmp):
+                    os.rename(tmp, local)
+                    size = os.path.getsize(local)
+                    with self._lock:
+                        self._entries[name] = size
+                        self.size += size
+                        self._evict()
+                else:
+                    DEBUG_LOG('Slide cache: Failed to copy {0}'.format(kodiutil.strRepr(path)))
+            except Exception:
+                kodiutil.ERROR()
+            finally:
+                with self._lock:
+                    self._queued.discard(path)
+
+        while True:  # Forget anything left so it can be queued again next time
+            try:
+                path = self._pending.get_nowait()
+            except Queue.Empty:
+                break
+            with self._lock:
+                self._queued.discard(path)
+
+    def _evict(self):
+        while self.size > self.maxSize and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self.size -= size
+            try:
+                os.remove(os.path.join(self.path, name))
+            except OSError:
+                pass
+
+
 class SettingControl:
     def __init__(self, setting, log_display, disable_value=''):
         self.setting = setting
@@ -214,6 +481,7 @@ class ExperienceWindow(kodigui.BaseWindow):
         self.action = None
         self.volume = None
         self.abortFlag = None
+        self.scheduler = None
         self.effect = None
         self.duration = 400
         self.lastImage = ''
@@ -228,10 +496,15 @@ class ExperienceWindow(kodigui.BaseWindow):
         self.image = (self.getControl(100), self.getControl(101))
         self.skipNotice = self.getControl(200)
         self.initialized = True
+        self.wake()
+
+    def wake(self):
+        if self.scheduler:
+            self.scheduler.wake()
 
     def join(self):
-        while not kodiutil.wait(0.1) and not self.abortFlag.isSet():
-            if self.initialized:
+        while not self.initialized and not self.abortFlag.isSet():
+            if self.scheduler.wait(max_wait=1):
                 return
 
     def initialize(self):
@@ -348,6 +621,8 @@ class ExperienceWindow(kodigui.BaseWindow):
         except:
             kodiutil.ERROR()
             return kodigui.BaseWindow.onAction(self, action)
+        finally:
+            self.wake()
 
         kodigui.BaseWindow.onAction(self, action)
 
@@ -464,6 +739,11 @@ class ExperiencePlayer(xbmc.Player):
     DUMMY_FILE_PREV = 'script.cinemavision.dummy_PREV.mpeg'
     DUMMY_FILE_NEXT = 'script.cinemavision.dummy_NEXT.mpeg'
 
+    FULLSCREEN_CHECK_INTERVAL = 1  # Seconds between checks for things Kodi has no event for (window changes, fullscreen)
+    FADE_CURVE_NAMES = ('linear', 'log', 'scurve')  # Order of the trivia.musicFadeCurve setting values
+    RPC_CACHE_TTL = 60  # Seconds library and setting lookups are reused for during an experience
+    MUSIC_AHEAD = 2  # Songs kept queued after the one playing, more are added as each song starts
+
     def create(self, from_editor=False):
         # xbmc.Player.__init__(self)
         self.fromEditor = from_editor
@@ -473,6 +753,10 @@ class ExperiencePlayer(xbmc.Player):
         self.featureStub = os.path.join(kodiutil.ADDON_PATH, 'resources', 'videos', 'script.cinemavision.feature_stub.mp4')
         self.playStatus = self.NOT_PLAYING
         self.hasFullscreened = False
+        rpc.enableCache(self.RPC_CACHE_TTL)
+        self.slideCache = None
+        if kodiutil.getSetting('slides.cache', False):
+            self.slideCache = SlideCache(kodiutil.getSetting('slides.cache.size', 100))
         self.loadActions()
         self.init()
         return self
@@ -492,8 +776,14 @@ class ExperiencePlayer(xbmc.Player):
         self.play(item)
 
     # PLAYER EVENTS
+    def wake(self):
+        if getattr(self, 'scheduler', None):
+            self.scheduler.wake()
+
     @requiresStart
     def onPlayBackEnded(self):
+        self.wake()
+        self.volume.stopped()
         if self.playStatus != self.PLAYING_MUSIC:
             self.volume.restore()
 
@@ -515,6 +805,8 @@ class ExperiencePlayer(xbmc.Player):
 
     @requiresStart
     def onPlayBackPaused(self):
+        self.wake()
+        self.volume.pause()
         DEBUG_LOG('PLAYBACK PAUSED')
         if self.pauseAction:
             DEBUG_LOG('Executing pause action: {0}'.format(self.pauseAction))
@@ -522,6 +814,8 @@ class ExperiencePlayer(xbmc.Player):
 
     @requiresStart
     def onPlayBackResumed(self):
+        self.wake()
+        self.volume.resume()
         DEBUG_LOG('PLAYBACK RESUMED')
         if self.resumeAction is True:
             resumeAction = self.processor.lastAction()
@@ -534,8 +828,10 @@ class ExperiencePlayer(xbmc.Player):
 
     @requiresStart
     def onPlayBackStarted(self):
+        self.wake()
         if self.playStatus == self.PLAYING_MUSIC:
             DEBUG_LOG('MUSIC STARTED')
+            self.feedMusic()
             return
 
         self.setPlayStatus(time.time())
@@ -557,6 +853,9 @@ class ExperiencePlayer(xbmc.Player):
 
     @requiresStart
     def onPlayBackStopped(self):
+        self.flushWatched()
+        self.wake()
+        self.volume.stopped()
         if self.playStatus != self.PLAYING_MUSIC:
             self.volume.restore()
 
@@ -604,8 +903,17 @@ class ExperiencePlayer(xbmc.Player):
 
     def init(self):
         self.abortFlag = threading.Event()
+        self.scheduler = Scheduler(xbmc.Monitor())
         self.window = None
-        self.volume = KodiVolumeControl(self.abortFlag)
+        self.processor = None
+        self.musicFeed = None
+        self.musicLock = threading.Lock()
+        self.volume = KodiVolumeControl(
+            self.abortFlag,
+            self.scheduler,
+            curve=self.FADE_CURVE_NAMES[kodiutil.getSetting('trivia.musicFadeCurve', 0)],
+            step_rate=kodiutil.getSetting('trivia.musicFadeRate', 20)
+        )
         self.screensaver = SettingControl('screensaver.mode', 'Screensaver')
         self.visualization = SettingControl('musicplayer.visualisation', 'Visualization')
         self.playGUISounds = SettingControl('audiooutput.guisoundmode', 'Play GUI sounds', disable_value=0)
@@ -711,12 +1019,17 @@ class ExperiencePlayer(xbmc.Player):
 
         try:
             details = rpc.VideoLibrary.GetMovieSetDetails(setid=DBID)
-            for m in details['setdetails']['movies']:
-                try:
-                    r = rpc.VideoLibrary.GetMovieDetails(
+            with rpc.batch() as batch:
+                calls = [
+                    batch.VideoLibrary.GetMovieDetails(
                         movieid=m['movieid'],
                         properties=['file', 'genre', 'tag', 'mpaa', 'streamdetails', 'title', 'thumbnail', 'runtime', 'year', 'studio', 'director', 'cast']
-                    )['moviedetails']
+                    ) for m in details['setdetails']['movies']
+                ]
+
+            for call in calls:
+                try:
+                    r = call.result()['moviedetails']
                     feature = self.featureFromJSON(r)
                     self.features.append(feature)
                 except:
@@ -884,10 +1197,14 @@ class ExperiencePlayer(xbmc.Player):
             self.volume.set(volume, relative=True)
 
         if features:
-            rpc.Playlist.Add(playlistid=xbmc.PLAYLIST_VIDEO, item={'file': self.fakeFilePrev})
-            for feature in features:
-                self.addFeatureToPlaylist(feature)
-            rpc.Playlist.Add(playlistid=xbmc.PLAYLIST_VIDEO, item={'file': self.fakeFileNext})
+            with rpc.batch() as batch:
+                batch.Playlist.Add(playlistid=xbmc.PLAYLIST_VIDEO, item={'file': self.fakeFilePrev})
+                for feature in features:
+                    self.addFeatureToPlaylist(feature, batch)
+                batch.Playlist.Add(playlistid=xbmc.PLAYLIST_VIDEO, item={'file': self.fakeFileNext})
+
+            for call in batch.calls:
+                call.result()  # Raise if any of the adds failed
         else:
             for video in videos:
                 pli = self.getPathAndListItemFromVideo(video)
@@ -903,7 +1220,7 @@ class ExperiencePlayer(xbmc.Player):
         xbmc.sleep(100)
         while not xbmc.getCondVisibility('VideoPlayer.IsFullscreen') and not xbmc.abortRequested and not self.abortFlag.isSet() and self.isPlaying():
             xbmc.executebuiltin('ActivateWindow(fullscreenvideo)')
-            xbmc.sleep(100)
+            self.scheduler.wait(max_wait=0.5)  # Player events wake us early
         self.hasFullscreened = True
         DEBUG_LOG('VIDEO HAS GONE FULLSCREEN')
 
@@ -920,14 +1237,14 @@ class ExperiencePlayer(xbmc.Player):
 
         rpc.Playlist.Add(playlistid=xbmc.PLAYLIST_VIDEO, item={'file': path})
 
-    def addFeatureToPlaylist(self, feature):
+    def addFeatureToPlaylist(self, feature, batch=None):
         if feature.dbType == 'movie':
             item = {'movieid': feature.ID}
         elif feature.dbType == 'tvshow':
             item = {'episodeid': feature.ID}
         else:
             item = {'file': feature.path}
-        rpc.Playlist.Add(playlistid=xbmc.PLAYLIST_VIDEO, item=item)
+        (batch or rpc).Playlist.Add(playlistid=xbmc.PLAYLIST_VIDEO, item=item)
 
     def videoPreDelay(self):
         delay = kodiutil.getSetting('video.preDelay', 0)
@@ -981,6 +1298,8 @@ class ExperiencePlayer(xbmc.Player):
             kodiutil.setGlobalProperty('running', '')
             xbmcgui.Window(10025).setProperty('CinemaExperienceRunning', '')
             self.initSkinVars()
+            rpc.enableCache(0)  # The editor keeps running after an experience and must see library changes
+            cinemavision.actions.closeHTTPSession()  # Don't hold kept-alive connections to action hosts open
 
     def _start(self, sequence_path):
         import cvutil
@@ -1005,10 +1324,11 @@ class ExperiencePlayer(xbmc.Player):
         self.window.player = self
         self.window.volume = self.volume
         self.window.abortFlag = self.abortFlag
+        self.window.scheduler = self.scheduler
         self.window.join()
 
     def waitLoop(self):
-        while not kodiutil.wait(0.1) and self.window.isOpen:
+        while not self.scheduler.wait(max_wait=self.FULLSCREEN_CHECK_INTERVAL) and self.window.isOpen:
             if self.processor.atEnd():
                 break
 
@@ -1019,6 +1339,7 @@ class ExperiencePlayer(xbmc.Player):
             if not self.processor.atEnd():
                 self.onAbort()
 
+        self.flushWatched()
         DEBUG_LOG('[ -- Finished -------------------------------------------------------------- ]\n.')
         self.window.doClose()
         rpc.Playlist.Clear(playlistid=xbmc.PLAYLIST_VIDEO)
@@ -1054,12 +1375,13 @@ class ExperiencePlayer(xbmc.Player):
 
         pl = xbmc.PlayList(xbmc.PLAYLIST_MUSIC)
         pl.clear()
-        for s in image_queue.music:
-            pl.add(s.path)
+        with self.musicLock:
+            self.musicFeed = iter(image_queue.music)
+        self.feedMusic()
 
         xbmc.sleep(100)  # Without this, it will sometimes not play anything
 
-        DEBUG_LOG('Playing music playlist: {0} song(s)'.format(len(pl)))
+        DEBUG_LOG('Playing music playlist: {0} song(s)'.format(len(image_queue.music)))
 
         self.volume.store()
         self.volume.set(1)
@@ -1070,13 +1392,36 @@ class ExperiencePlayer(xbmc.Player):
         self.waitForPlayStart()  # Wait playback so fade will work
         self.volume.set(image_queue.musicVolume, fade_time=int(image_queue.musicFadeIn * 1000), relative=True)
 
+    # Adds songs from the schedule until MUSIC_AHEAD are queued after the current one
+    def feedMusic(self):
+        with self.musicLock:
+            if not self.musicFeed:
+                return
+
+            pl = xbmc.PlayList(xbmc.PLAYLIST_MUSIC)
+            while len(pl) - max(pl.getposition(), 0) <= self.MUSIC_AHEAD:
+                song = next(self.musicFeed, None)
+                if song is None:
+                    self.musicFeed = None
+                    return
+                pl.add(song.path)
+
+    # Stops queueing songs and starts the fade out on the fader thread without waiting for it
+    def fadeOutMusic(self, image_queue=None):
+        with self.musicLock:
+            self.musicFeed = None
+
+        rpc.Playlist.Clear(playlistid=xbmc.PLAYLIST_MUSIC)
+
+        if image_queue and image_queue.music:
+            self.volume.set(1, fade_time=int(image_queue.musicFadeOut * 1000))
+
     def stopMusic(self, image_queue=None):
         try:
-            rpc.Playlist.Clear(playlistid=xbmc.PLAYLIST_MUSIC)
+            self.fadeOutMusic(image_queue)
 
             if image_queue and image_queue.music:
-                self.volume.set(1, fade_time=int(image_queue.musicFadeOut * 1000))
-                while self.volume.fading() and not self.abortFlag.isSet() and not kodiutil.wait(0.1):
+                while self.volume.fading() and not self.abortFlag.isSet() and not self.scheduler.wait(max_wait=self.FULLSCREEN_CHECK_INTERVAL):
                     if self.window.hasAction() and self.window.action != 'RESUME':
                         break
 
@@ -1088,26 +1433,35 @@ class ExperiencePlayer(xbmc.Player):
             self.volume.restore(delay=500)
 
     def waitForPlayStart(self, timeout=10000):
-        giveUpTime = time.time() + timeout / 1000.0
-        while not xbmc.getCondVisibility('Player.Playing') and time.time() < giveUpTime and not self.abortFlag.isSet():
-            xbmc.sleep(100)
+        giveUpTime = self.scheduler.clock() + timeout / 1000.0
+        while not xbmc.getCondVisibility('Player.Playing') and self.scheduler.clock() < giveUpTime and not self.abortFlag.isSet():
+            if self.scheduler.wait(giveUpTime, max_wait=0.25):  # True on abort, onPlayBackStarted wakes it to re-check
+                return
 
     def waitForPlayStop(self):
         while self.isPlaying() and not self.abortFlag.isSet():
-            xbmc.sleep(100)
+            if self.scheduler.wait(max_wait=0.5):  # True on abort, onPlayBackStopped/Ended wake it to re-check
+                return
+
+    def nextDeadline(self, *times):
+        if self.window.paused():  # Only a resume (or other action) can end the wait
+            return None
+
+        times = [t for t in times if t]
+        return times and min(times) or None
 
     def showImage(self, image):
         try:
             if image.fade:
                 self.window.setTransition('fadesingle', image.fade)
 
-            self.window.setImage(image.path)
+            self.window.setImage(self.getImagePath(image.path))
 
-            stop = time.time() + image.duration
+            stop = self.scheduler.clock() + image.duration
             fadeStop = image.fade and stop - (image.fade / 1000) or 0
 
-            while not kodiutil.wait(0.1) and (time.time() < stop or self.window.paused()):
-                if fadeStop and time.time() >= fadeStop and not self.window.paused():
+            while not self.scheduler.wait(self.nextDeadline(stop, fadeStop)) and (self.scheduler.clock() < stop or self.window.paused()):
+                if fadeStop and self.scheduler.clock() >= fadeStop and not self.window.paused():
                     fadeStop = None
                     self.window.fadeOut()
 
@@ -1130,19 +1484,38 @@ class ExperiencePlayer(xbmc.Player):
         finally:
             self.window.clear()
 
+    def getImagePath(self, path):
+        if self.slideCache:
+            return self.slideCache.get(path)
+        return path
+
     def showImageFromQueue(self, image, info, first=None):
-        self.window.setImage(image.path)
+        self.window.setImage(self.getImagePath(image.path))
 
-        stop = time.time() + image.duration
+        stop = self.scheduler.clock() + image.duration
 
-        while not kodiutil.wait(0.1) and (time.time() < stop or self.window.paused()):
+        while (
+            not self.scheduler.wait(self.nextDeadline(stop, info.musicEnd), max_wait=self.FULLSCREEN_CHECK_INTERVAL) and
+            (self.scheduler.clock() < stop or self.window.paused())
+        ):
             if not self.window.isOpen:
                 return False
 
-            if info.musicEnd and time.time() >= info.musicEnd and not self.window.paused():
+            # The music fades and stops while the slides go on, each step is woken by the fader or the player
+            if info.musicEnd and self.scheduler.clock() >= info.musicEnd and not self.window.paused():
                 info.musicEnd = None
-                self.stopMusic(info.imageQueue)
-            elif self.window.action:
+                info.musicState = 'FADING'
+                self.fadeOutMusic(info.imageQueue)
+            elif info.musicState == 'FADING' and not self.volume.fading():
+                info.musicState = 'STOPPING'
+                kodiutil.DEBUG_LOG('Stopping music')
+                self.setPlayStatus(self.MUSIC_STOPPED)
+                self.stop()
+            elif info.musicState == 'STOPPING' and not self.isPlaying():
+                info.musicState = None
+                self.volume.restore()
+
+            if self.window.action:
                 if self.window.next():
                     return 'NEXT'
                 elif self.window.prev():
@@ -1157,6 +1530,8 @@ class ExperiencePlayer(xbmc.Player):
                     return 'BACK'
                 elif self.window.resume():
                     stop += self.window.pauseDuration()
+                    if info.musicEnd:
+                        info.musicEnd += self.window.pauseDuration()
                     self.window.finishPause()
 
             if xbmcgui.getCurrentWindowId() != self.window._winID:  # Prevent switching to another window as it's not a good idea
@@ -1168,14 +1543,18 @@ class ExperiencePlayer(xbmc.Player):
         def __init__(self, image_queue, music_end):
             self.imageQueue = image_queue
             self.musicEnd = music_end
+            self.musicState = None  # 'FADING' then 'STOPPING' once the music fades out before the queue ends
 
     def showImageQueue(self, image_queue):
         image_queue.reset()
         image = image_queue.next()
 
+        if self.slideCache:
+            self.slideCache.prefetch(image_queue)
+
         start = time.time()
-        end = time.time() + image_queue.duration
-        musicEnd = [end - image_queue.musicFadeOut]
+        end = self.scheduler.clock() + image_queue.duration
+        musicEnd = end - image_queue.musicFadeOut
 
         info = self.ImageQueueInfo(image_queue, musicEnd)
 
@@ -1198,6 +1577,9 @@ class ExperiencePlayer(xbmc.Player):
             while image:
                 DEBUG_LOG(' -IMAGE.QUEUE: {0}'.format(image))
 
+                if self.slideCache:
+                    self.slideCache.prefetch(image_queue)
+
                 action = self.showImageFromQueue(image, info, first=True)
 
                 if action:
@@ -1229,9 +1611,15 @@ class ExperiencePlayer(xbmc.Player):
                 else:
                     return
         finally:
+            self.flushWatched()
+            if self.slideCache:
+                self.slideCache.stop()
             kodiutil.setGlobalProperty('paused', '')
             xbmc.enableNavSounds(True)
-            self.stopMusic(action != 'BACK' and image_queue or None)
+            if info.musicEnd is not None:
+                self.stopMusic(action != 'BACK' and image_queue or None)
+            elif info.musicState:  # Finish a fade out that started at musicEnd without fading again
+                self.stopMusic()
             if self. window.hasAction():
                 if self.window.getAction() == 'BACK':
                     return False
@@ -1246,6 +1634,7 @@ class ExperiencePlayer(xbmc.Player):
             pl.append(v.path)
             video_queue.mark(v)
 
+        self.flushWatched()
         self.playVideos(pl)
 
     def showVideo(self, video):
@@ -1317,7 +1706,18 @@ class ExperiencePlayer(xbmc.Player):
             DEBUG_LOG('NOT PLAYING: {0}'.format(playable))
             self.next()
 
+    def flushWatched(self):
+        if not self.processor:
+            return
+
+        try:
+            self.processor.flushWatched()
+        except:
+            kodiutil.ERROR()
+
     def abort(self):
+        self.flushWatched()
         self.abortFlag.set()
+        self.wake()
         DEBUG_LOG('ABORT')
         self.window.doClose()
@@ -1,5 +1,9 @@
-import xbmc
 import json
+import time
+import threading
+
+# Read only methods whose results may be cached when the cache is enabled
+CACHEABLE_PREFIXES = ('VideoLibrary.Get', 'Settings.GetSettingValue')
 
 
 class JSONRPCMethod:
@@ -7,44 +11,196 @@ class JSONRPCMethod:
     class Exception(Exception):
         pass
 
-    def __init__(self):
-        self.family = None
+    def __init__(self, client, family=None):
+        self.client = client
+        self.family = family
 
     def __getattr__(self, method):
         def handler(**kwargs):
-            command = {
-                'jsonrpc': '2.0',
-                'id': 1,
-                'method': '{0}.{1}'.format(self.family, method)
-            }
+            return self.client.call('{0}.{1}'.format(self.family, method), kwargs)
 
-            if kwargs:
-                command['params'] = kwargs
+        return handler
 
-            # print json.dumps(command)
+    def __call__(self, family):
+        return JSONRPCMethod(self.client, family)
 
-            ret = json.loads(xbmc.executeJSONRPC(json.dumps(command)))
 
-            if ret:
-                if 'error' in ret:
-                    raise self.Exception(ret['error'])
-                else:
-                    return ret['result']
-            else:
-                return None
+# A single call queued in a batch. result() returns the result or raises the call's error
+class BatchCall:
+    def __init__(self, method, params):
+        self.method = method
+        self.params = params
+        self.done = False
+        self._result = None
+        self._error = None
 
-        return handler
+    def set(self, ret):
+        self.done = True
+        if not ret:
+            return
+        if 'error' in ret:
+            self._error = ret['error']
+        else:
+            self._result = ret.get('result')
 
-    def __call__(self, family):
-        self.family = family
+    def result(self):
+        if not self.done:
+            raise JSONRPCMethod.Exception('Batch not executed: {0}'.format(self.method))
+        if self._error:
+            raise JSONRPCMethod.Exception(self._error)
+        return self._result
+
+
+# Collects calls and sends them as one JSON-RPC batch array on execute() or when used as a context manager:
+#
+#   with rpc.batch() as batch:
+#       calls = [batch.VideoLibrary.GetMovieDetails(movieid=i) for i in ids]
+#   details = [c.result() for c in calls]
+class JSONRPCBatch:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, family):
+        return BatchFamily(self, family)
+
+    def __enter__(self):
         return self
 
+    def __exit__(self, exc_type, exc_value, tb):
+        if not exc_type:
+            self.execute()
+
+    def add(self, method, params):
+        call = BatchCall(method, params)
+        self.calls.append(call)
+        return call
+
+    def execute(self):
+        self.client.callBatch([c for c in self.calls if not c.done])
+        return self.calls
+
+
+class BatchFamily:
+    def __init__(self, batch, family):
+        self.batch = batch
+        self.family = family
+
+    def __getattr__(self, method):
+        def handler(**kwargs):
+            return self.batch.add('{0}.{1}'.format(self.family, method), kwargs)
+
+        return handler
+
+
+# xbmc is imported on first use so the client can be used outside Kodi
+def executeJSONRPC(data):
+    import xbmc
+    return xbmc.executeJSONRPC(data)
+
 
 class KodiJSONRPC:
-    def __init__(self):
-        self.methodHandler = JSONRPCMethod()
+    def __init__(self, transport=None):
+        self.transport = transport or executeJSONRPC
+        self.methodHandler = JSONRPCMethod(self)
+        self.cacheTTL = 0
+        self._cache = {}
+        self._lock = threading.Lock()
 
     def __getattr__(self, family):
         return self.methodHandler(family)
 
+    def batch(self):
+        return JSONRPCBatch(self)
+
+    # Opt-in caching of read only methods (see CACHEABLE_PREFIXES). A ttl of 0 disables it.
+    def enableCache(self, ttl=30):
+        self.cacheTTL = ttl
+        if not ttl:
+            self.clearCache()
+
+    def clearCache(self, family=None):
+        with self._lock:
+            if family:
+                for key in [k for k in self._cache if k.startswith(family + '.')]:
+                    del self._cache[key]
+            else:
+                self._cache.clear()
+
+    def _cacheKey(self, method, params):
+        if not self.cacheTTL or not method.startswith(CACHEABLE_PREFIXES):
+            return None
+        return method + json.dumps(params or {}, sort_keys=True)
+
+    def _cached(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry and entry[0] > time.time():
+                return json.loads(entry[1])  # Stored serialized so callers can't modify cached results
+
+            self._cache.pop(key, None)
+            return None
+
+    def _store(self, method, key, ret):
+        if key:
+            if 'error' not in ret:
+                with self._lock:
+                    self._cache[key] = (time.time() + self.cacheTTL, json.dumps(ret))
+        elif self.cacheTTL:
+            # Anything that isn't a cached read may change what the family's reads return
+            self.clearCache(method.split('.', 1)[0])
+
+    def _command(self, method, params, ID=1):
+        command = {
+            'jsonrpc': '2.0',
+            'id': ID,
+            'method': method
+        }
+
+        if params:
+            command['params'] = params
+
+        return command
+
+    def call(self, method, params=None):
+        key = self._cacheKey(method, params)
+        ret = key and self._cached(key)
+        if not ret:
+            ret = json.loads(self.transport(json.dumps(self._command(method, params))))
+            if ret:
+                self._store(method, key, ret)
+
+        if ret:
+            if 'error' in ret:
+                raise JSONRPCMethod.Exception(ret['error'])
+            else:
+                return ret['result']
+        else:
+            return None
+
+    def callBatch(self, calls):
+        pending = []
+        for call in calls:
+            key = self._cacheKey(call.method, call.params)
+            cached = key and self._cached(key)
+            if cached:
+                call.set(cached)
+            else:
+                pending.append((call, key))
+
+        if not pending:
+            return
+
+        commands = [self._command(call.method, call.params, i) for i, (call, key) in enumerate(pending)]
+        ret = json.loads(self.transport(json.dumps(commands))) or []
+        if isinstance(ret, dict):  # A batch level error comes back as a single response
+            byID = dict((i, ret) for i in range(len(pending)))
+        else:
+            byID = dict((r.get('id'), r) for r in ret if isinstance(r, dict))
+
+        for i, (call, key) in enumerate(pending):
+            response = byID.get(i) or {'error': {'code': -32603, 'message': 'No response'}}
+            self._store(call.method, key, response)
+            call.set(response)
+
 rpc = KodiJSONRPC()
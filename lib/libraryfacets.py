@@ -0,0 +1,234 @@
+import os
+import json
+import time
+import threading
+
+import xbmc
+
+import kodiutil
+from kodijsonrpc import rpc
+
+CACHE_VERSION = 1
+PAGE_SIZE = 500
+DETAILS_BATCH_SIZE = 50
+MAX_AGE = 7 * 24 * 60 * 60  # Seconds before a saved cache is rebuilt, as the signature misses metadata only changes
+
+FACETS = ('studio', 'director', 'actor', 'genre', 'tag')
+PROPERTIES = ['studio', 'director', 'cast', 'genre', 'tag']
+
+
+def movieFacets(movie):
+    return {
+        'studio': movie.get('studio') or [],
+        'director': movie.get('director') or [],
+        'actor': [c['name'] for c in movie.get('cast') or [] if c.get('name')],
+        'genre': movie.get('genre') or [],
+        'tag': movie.get('tag') or []
+    }
+
+
+# Distinct studios/directors/actors/genres/tags of the movie library with the number of movies for each.
+# Facets for every movie are kept so single movies can be updated or removed without a full rebuild.
+# The cache is saved to the profile and checked against the library when loaded. The check only notices
+# movies being added or removed. Changes to existing movies arrive as OnUpdate notifications while we're
+# running, but ones made while we weren't (a scraper refresh, edited tags) are only picked up by the rebuild
+# of caches older than MAX_AGE.
+class LibraryFacets:
+    def __init__(self, path=None):
+        self.path = path or os.path.join(kodiutil.PROFILE_PATH, 'library_facets.json')
+        self.movies = {}
+        self.counts = dict((f, {}) for f in FACETS)
+        self.signature = None
+        self.built = 0
+        self._loaded = False
+        self._dirty = False
+        self._lock = threading.RLock()
+
+    def _add(self, movieid, facets):
+        self._remove(movieid)
+        self.movies[movieid] = facets
+        for facet in FACETS:
+            counts = self.counts[facet]
+            for val in set(facets.get(facet, [])):
+                counts[val] = counts.get(val, 0) + 1
+
+    def _remove(self, movieid):
+        facets = self.movies.pop(movieid, None)
+        if not facets:
+            return
+
+        for facet in FACETS:
+            counts = self.counts[facet]
+            for val in set(facets.get(facet, [])):
+                count = counts.get(val, 0) - 1
+                if count > 0:
+                    counts[val] = count
+                else:
+                    counts.pop(val, None)
+
+    def _clear(self):
+        self.movies = {}
+        self.counts = dict((f, {}) for f in FACETS)
+
+    def _getMovies(self, properties):
+        start = 0
+        while True:
+            ret = rpc.VideoLibrary.GetMovies(properties=properties, limits={'start': start, 'end': start + PAGE_SIZE})
+            movies = ret.get('movies', [])
+            for m in movies:
+                yield m
+
+            start += PAGE_SIZE
+            if not movies or start >= ret.get('limits', {}).get('total', 0):
+                break
+
+    # Movie count plus the most recently added movie. Cheap to get, and changes whenever movies are added or removed.
+    def _librarySignature(self):
+        ret = rpc.VideoLibrary.GetMovies(sort={'method': 'dateadded', 'order': 'descending'}, limits={'start': 0, 'end': 1})
+        movies = ret.get('movies', [])
+        return [ret.get('limits', {}).get('total', 0), movies and movies[0].get('movieid') or None]
+
+    def _fetchDetails(self, ids):
+        for i in range(0, len(ids), DETAILS_BATCH_SIZE):
+            with rpc.batch() as batch:
+                calls = [(movieid, batch.VideoLibrary.GetMovieDetails(movieid=movieid, properties=PROPERTIES)) for movieid in ids[i:i + DETAILS_BATCH_SIZE]]
+
+            for movieid, call in calls:
+                try:
+                    self._add(movieid, movieFacets(call.result().get('moviedetails', {})))
+                except Exception:
+                    kodiutil.ERROR('Failed to get details for movie: {0}'.format(movieid))
+
+    def load(self):
+        with self._lock:
+            if self._loaded:
+                return
+
+            self._loaded = True
+
+            try:
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+            except (IOError, OSError, ValueError):
+                data = None
+
+            if data and data.get('version') == CACHE_VERSION and time.time() - data.get('built', 0) < MAX_AGE:
+                for movieid, facets in data.get('movies', {}).items():
+                    self._add(int(movieid), facets)
+                self.signature = data.get('signature')
+                self.built = data.get('built')
+
+            if self.movies:
+                self.sync()
+            else:
+                self.rebuild()
+
+    def save(self):
+        with self._lock:
+            try:
+                with open(self.path, 'w') as f:
+                    json.dump({'version': CACHE_VERSION, 'signature': self.signature, 'built': self.built, 'movies': self.movies}, f)
+                self._dirty = False
+            except (IOError, OSError):
+                kodiutil.ERROR('Failed to save library facets')
+
+    def rebuild(self):
+        with self._lock:
+            self._clear()
+            for movie in self._getMovies(PROPERTIES):
+                self._add(movie['movieid'], movieFacets(movie))
+
+            self.signature = self._librarySignature()
+            self.built = time.time()
+            kodiutil.DEBUG_LOG('Library facets: Built from {0} movies'.format(len(self.movies)))
+            self.save()
+
+    # Brings the cache up to date after library changes made while we weren't watching.
+    # Only the ids are listed and details are fetched for added movies.
+    def sync(self):
+        with self._lock:
+            signature = self._librarySignature()
+            if signature == self.signature:
+                if self._dirty:
+                    self.save()
+                return
+
+            ids = set(m['movieid'] for m in self._getMovies([]))
+            removed = [movieid for movieid in self.movies if movieid not in ids]
+            added = [movieid for movieid in ids if movieid not in self.movies]
+
+            for movieid in removed:
+                self._remove(movieid)
+            self._fetchDetails(added)
+
+            self.signature = signature
+            kodiutil.DEBUG_LOG('Library facets: Synced ({0} added, {1} removed)'.format(len(added), len(removed)))
+            self.save()
+
+    # A scan sends an update for every movie, so saving waits for the scan to finish.
+    # The saved signature is left alone, a stale one only means sync() compares ids on the next load.
+    def _changed(self):
+        self._dirty = True
+        if not xbmc.getCondVisibility('Library.IsScanningVideo'):
+            self.save()
+
+    def updateMovie(self, movieid):
+        with self._lock:
+            self._fetchDetails([movieid])
+            self._changed()
+
+    def removeMovie(self, movieid):
+        with self._lock:
+            if movieid not in self.movies:
+                return
+            self._remove(movieid)
+            self._changed()
+
+    def values(self, facet, remove=None):
+        self.load()
+        with self._lock:
+            return sorted(v for v in self.counts[facet] if not remove or v not in remove)
+
+    def valueCounts(self, facet):
+        self.load()
+        with self._lock:
+            return sorted(self.counts[facet].items(), key=lambda x: (-x[1], x[0]))
+
+
+class LibraryMonitor(xbmc.Monitor):
+    def __init__(self, facets):
+        xbmc.Monitor.__init__(self)
+        self.facets = facets
+
+    def onNotification(self, sender, method, data):
+        if not method.startswith('VideoLibrary.') or not self.facets._loaded:
+            return
+
+        try:
+            if method in ('VideoLibrary.OnScanFinished', 'VideoLibrary.OnCleanFinished'):
+                self.facets.sync()
+                return
+
+            data = json.loads(data or '{}')
+            item = data.get('item', data)  # Older versions send the item at the top level
+            if item.get('type') != 'movie' or not item.get('id'):
+                return
+
+            if method == 'VideoLibrary.OnUpdate':
+                self.facets.updateMovie(item['id'])
+            elif method == 'VideoLibrary.OnRemove':
+                self.facets.removeMovie(item['id'])
+        except Exception:
+            kodiutil.ERROR()
+
+
+_FACETS = None
+_MONITOR = None
+
+
+def getFacets():
+    global _FACETS, _MONITOR
+    if not _FACETS:
+        _FACETS = LibraryFacets()
+        _MONITOR = LibraryMonitor(_FACETS)
+    return _FACETS
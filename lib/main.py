@@ -1079,7 +1079,7 @@ class SequenceEditorWindow(kodigui.BaseWindow):
         kodiutil.DEBUG_LOG('Saving to: {0}'.format(full_path))
 
         try:
-            success = self.sequenceData.save(full_path)
+            success = self.sequenceData.save(full_path, update_index=not temp)
         except cinemavision.exceptions.SequenceWriteReadEmptyException:
             xbmcgui.Dialog().ok(
                 T(32573, 'Failed'),
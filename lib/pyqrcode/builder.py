@@ -33,6 +33,45 @@ from __future__ import absolute_import, division, print_function, with_statement
 from . import tables as tables
 import io
 import itertools
+import re
+
+#: Set to False to always use the pure Python mask code even when NumPy is
+#: available.
+use_numpy = True
+
+_numpy = None
+
+#: Layouts shared by all codes of a version, see QRCodeBuilder.get_layout()
+_layouts = {}
+
+#: Turn a string of '0' and '1' characters into bytes of 0 and 1 and back
+_bit_table = bytes(bytearray(range(48)) + bytearray([0, 1]) + bytearray(range(50, 256)))
+_digit_table = bytes(bytearray([48, 49]) + bytearray(range(2, 256)))
+
+#: Runs of five or more modules of the same color (penalty rule 1)
+_run_re = re.compile(br'\x00{5,}|\x01{5,}')
+
+#: 1011101 with four light modules before or after it (penalty rule 3).
+#: Written as a lookahead so that overlapping matches are all counted.
+_finder_re = re.compile(br'(?=\x00\x00\x00\x00\x01\x00\x01\x01\x01\x00\x01|'
+                        br'\x01\x00\x01\x01\x01\x00\x01\x00\x00\x00\x00)')
+
+
+def _get_numpy():
+    """Returns the numpy module when it can be imported and use_numpy is
+    set, otherwise None.
+    """
+    global _numpy
+    if not use_numpy:
+        return None
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy or None
+
 
 class QRCodeBuilder:
     """This class generates a QR code based on the standard. It is meant to
@@ -443,25 +482,82 @@ class QRCodeBuilder:
 
     def make_code(self):
         """This method returns the best possible QR code."""
-        from copy import deepcopy
-
         #Get the size of the underlying matrix
-        matrix_size = tables.version_size[self.version]
+        self.size = tables.version_size[self.version]
+
+        #Create the various types of masks of the template
+        self.masks = self.make_masks(self.get_layout())
+
+        self.best_mask = self.choose_best_mask()
+
+        #The output functions expect a list of rows
+        best = bytearray(self.masks[self.best_mask])
+        self.code = [list(best[i:i+self.size])
+                     for i in range(0, len(best), self.size)]
+
+    def get_layout(self):
+        """This method returns the layout shared by every code of this
+        code's version: the template as a flat bytearray (row by row), where
+        each of the 15 type bits goes, the data module positions in placement
+        order and, for each mask pattern, which of those modules are flipped.
+        Layouts are cached per version.
+        """
+        layout = _layouts.get(self.version)
+        if layout:
+            return layout
+
+        size = tables.version_size[self.version]
 
         #Create a template matrix we will build the codes with
-        row = [' ' for x in range(matrix_size)]
-        template = [deepcopy(row) for x in range(matrix_size)]
+        template = [[' '] * size for x in range(size)]
 
         #Add mandatory information to the template
         self.add_detection_pattern(template)
         self.add_position_pattern(template)
         self.add_version_pattern(template)
 
-        #Create the various types of masks of the template
-        self.masks = self.make_masks(template)
-
-        self.best_mask = self.choose_best_mask()
-        self.code = self.masks[self.best_mask]
+        #Placing the bit indexes instead of bits shows where each type
+        #bit goes
+        type_matrix = [[None] * size for x in range(size)]
+        self.add_type_pattern(type_matrix, list(range(15)))
+        type_positions = []
+        for row in range(size):
+            for col in range(size):
+                if type_matrix[row][col] is not None:
+                    type_positions.append((row*size+col, type_matrix[row][col]))
+                    template[row][col] = 0
+
+        #Walk the data pattern the same way the bits are placed. The data
+        #pattern is added using pairs of columns, moving up then down
+        data_positions = []
+        row_start = itertools.cycle([size-1, 0])
+        row_stop = itertools.cycle([-1, size])
+        direction = itertools.cycle([-1, 1])
+        for column in range(size-1, 0, -2):
+
+            #The vertical timing pattern is an exception to the rules,
+            #move the column counter over by one
+            if column <= 6:
+                column = column - 1
+
+            for row in range(next(row_start), next(row_stop), next(direction)):
+                #Fill in the right then left column, skipping preexisting
+                #patterns (usually an alignment pattern)
+                for col in (column, column-1):
+                    if template[row][col] == ' ':
+                        template[row][col] = 0
+                        data_positions.append((row, col))
+
+        flips = [bytearray(1 if pattern(row, col) else 0
+                           for row, col in data_positions)
+                 for pattern in tables.mask_patterns]
+
+        base = bytearray(bit for row in template for bit in row)
+        data_positions = [row*size+col for row, col in data_positions]
+
+        layout = (base, type_positions, data_positions, flips)
+        _layouts[self.version] = layout
+        return layout
 
     def add_detection_pattern(self, m):
         """This method add the detection patterns to the QR code. This lets
@@ -599,79 +695,46 @@ class QRCodeBuilder:
                 #Upper right
                 m[j][i] = bit
 
-    def make_masks(self, template):
-        """This method generates all seven masks so that the best mask can
-        be determined. The template parameter is a code matrix that will
-        server as the base for all the generated masks.
+    def make_masks(self, layout):
+        """This method generates all eight masks so that the best mask can
+        be determined. The layout parameter comes from get_layout() and
+        the masks are flat bytearrays (or NumPy arrays) of the code matrix.
         """
-        from copy import deepcopy
-
-        nmasks = len(tables.mask_patterns)
-        masks = [''] * nmasks
-        count = 0
-
-        for n in range(nmasks):
-            cur_mask = deepcopy(template)
-            masks[n] = cur_mask
-
-            #Add the type pattern bits to the code
-            self.add_type_pattern(cur_mask, tables.type_bits[self.error][n])
-
-            #Get the mask pattern
-            pattern = tables.mask_patterns[n]
-
-            #This will read the 1's and 0's one at a time
-            bits = iter(self.buffer.getvalue())
-
-            #These will help us do the up, down, up, down pattern
-            row_start = itertools.cycle([len(cur_mask)-1, 0])
-            row_stop = itertools.cycle([-1,len(cur_mask)])
-            direction = itertools.cycle([-1, 1])
-
-            #The data pattern is added using pairs of columns
-            for column in range(len(cur_mask)-1, 0, -2):
-
-                #The vertical timing pattern is an exception to the rules,
-                #move the column counter over by one
-                if column <= 6:
-                    column = column - 1
-
-                #This will let us fill in the pattern
-                #right-left, right-left, etc.
-                column_pair = itertools.cycle([column, column-1])
-
-                #Go through each row in the pattern moving up, then down
-                for row in range(next(row_start), next(row_stop),
-                                 next(direction)):
-
-                    #Fill in the right then left column
-                    for i in range(2):
-                        col = next(column_pair)
-
-                        #Go to the next column if we encounter a
-                        #preexisting pattern (usually an alignment pattern)
-                        if cur_mask[row][col] != ' ':
-                            continue
-
-                        #Some versions don't have enough bits. You then fill
-                        #in the rest of the pattern with 0's. These are
-                        #called "remainder bits."
-                        try:
-                            bit = int(next(bits))
-                        except:
-                            bit = 0
+        base, type_positions, data_positions, flips = layout
+
+        #The data bits, padded with 0's when a version doesn't have enough
+        #bits. These are called "remainder bits."
+        count = len(data_positions)
+        bits = bytearray(self.buffer.getvalue().encode('ascii').translate(_bit_table))
+        bits = bits[:count] + bytearray(max(count - len(bits), 0))
+
+        np = _get_numpy()
+        if np:
+            base = np.frombuffer(bytes(base), dtype=np.uint8)
+            type_index = np.array([p for p, k in type_positions], dtype=np.intp)
+            data_index = np.array(data_positions, dtype=np.intp)
+            bits = np.frombuffer(bytes(bits), dtype=np.uint8)
+
+        masks = []
+        for n in range(len(tables.mask_patterns)):
+            type_bits = tables.type_bits[self.error][n]
+
+            if np:
+                cur_mask = base.copy()
+                cur_mask[type_index] = [int(type_bits[k]) for p, k in type_positions]
+                cur_mask[data_index] = bits ^ np.frombuffer(bytes(flips[n]), dtype=np.uint8)
+            else:
+                cur_mask = bytearray(base)
 
+                #Add the type pattern bits to the code
+                for p, k in type_positions:
+                    cur_mask[p] = int(type_bits[k])
 
-                        #If the pattern is True then flip the bit
-                        if pattern(row, col):
-                            cur_mask[row][col] = bit ^ 1
-                        else:
-                            cur_mask[row][col] = bit
+                #If the pattern is True for a module then its bit is flipped
+                for p, bit, flip in zip(data_positions, bits, flips[n]):
+                    cur_mask[p] = bit ^ flip
 
-        #DEBUG CODE!!!
-        #Save all of the masks as png files
-        #for i, m in enumerate(masks):
-        #    _png(m, self.version, 'mask-{0}.png'.format(i), 5)
+            masks.append(cur_mask)
 
         return masks
 
@@ -681,135 +744,71 @@ class QRCodeBuilder:
         by the standard. The mask with the lowest total score should be the
         easiest to read by optical scanners.
         """
+        size = self.size
+        np = _get_numpy()
         self.scores = []
-        for n in range(len(self.masks)):
-            self.scores.append([0,0,0,0])
-
-        #Score penalty rule number 1
-        #Look for five consecutive squares with the same color.
-        #Each one found gets a penalty of 3 + 1 for every
-        #same color square after the first five in the row.
-        for (n, mask) in enumerate(self.masks):
-            current = mask[0][0]
-            counter = 0
-            total = 0
-
-            #Examine the mask row wise
-            for row in range(0,len(mask)):
-                counter = 0
-                for col  in range(0,len(mask)):
-                    bit = mask[row][col]
-
-                    if bit == current:
-                        counter += 1
-                    else:
-                        if counter >= 5:
-                            total += (counter - 5) + 3
-                        counter = 1
-                        current = bit
-                if counter >= 5:
-                    total += (counter - 5) + 3
-
-            #Examine the mask column wise
-            for col in range(0,len(mask)):
-                counter = 0
-                for row in range(0,len(mask)):
-                    bit = mask[row][col]
-
-                    if bit == current:
-                        counter += 1
-                    else:
-                        if counter >= 5:
-                            total += (counter - 5) + 3
-                        counter = 1
-                        current = bit
-                if counter >= 5:
-                    total += (counter - 5) + 3
-
-            self.scores[n][0] = total
-
-        #Score penalty rule 2
-        #This rule will add 3 to the score for each 2x2 block of the same
-        #colored pixels there are.
-        for (n, mask) in enumerate(self.masks):
-            count = 0
-            #Don't examine the 0th and Nth row/column
-            for i in range(0, len(mask)-1):
-                for j in range(0, len(mask)-1):
-                    if mask[i][j] == mask[i+1][j]   and \
-                       mask[i][j] == mask[i][j+1]   and \
-                       mask[i][j] == mask[i+1][j+1]:
-                        count += 1
-
-            self.scores[n][1] = count * 3
-
-        #Score penalty rule 3
-        #This rule looks for 1011101 within the mask prefixed
-        #and/or suffixed by four zeros.
-        patterns = [[0,0,0,0,1,0,1,1,1,0,1],
-                    [1,0,1,1,1,0,1,0,0,0,0],]
-                    #[0,0,0,0,1,0,1,1,1,0,1,0,0,0,0]]
-
-        for (n, mask) in enumerate(self.masks):
-            nmatches = 0
-
-            for i in range(len(mask)):
-                for j in range(len(mask)):
-                    for pattern in patterns:
-                        match = True
-                        k = j
-                        #Look for row matches
-                        for p in pattern:
-                            if k >= len(mask) or mask[i][k] != p:
-                                match = False
-                                break
-                            k += 1
-                        if match:
-                            nmatches += 1
-
-                        match = True
-                        k = j
-                        #Look for column matches
-                        for p in pattern:
-                            if k >= len(mask) or mask[k][i] != p:
-                                match = False
-                                break
-                            k += 1
-                        if match:
-                            nmatches += 1
-
-
-            self.scores[n][2] = nmatches * 40
-
-        #Score the last rule, penalty rule 4. This rule measures how close
-        #the pattern is to being 50% black. The further it deviates from
-        #this this ideal the higher the penalty.
-        for (n, mask) in enumerate(self.masks):
-            nblack = 0
-            for row in mask:
-                nblack += sum(row)
-
-            total_pixels = len(mask)**2
+
+        for mask in self.masks:
+            #Rows then columns as one byte string, separated by a value that
+            #is neither color so that runs and patterns stay within a line
+            if np:
+                grid = mask.reshape(size, size)
+                sep = np.full((size, 1), 2, dtype=np.uint8)
+                lines = np.concatenate((grid, sep), axis=1).tobytes() + \
+                        np.concatenate((grid.T, sep), axis=1).tobytes()
+            else:
+                rows = [bytes(mask[i:i+size]) for i in range(0, size*size, size)]
+                cols = [bytes(mask[i::size]) for i in range(size)]
+                lines = b'\x02'.join(rows + cols)
+
+            #Score penalty rule number 1
+            #Look for five consecutive squares with the same color.
+            #Each one found gets a penalty of 3 + 1 for every
+            #same color square after the first five in the row.
+            score1 = sum(m.end() - m.start() - 2 for m in _run_re.finditer(lines))
+
+            #Score penalty rule 2
+            #This rule will add 3 to the score for each 2x2 block of the same
+            #colored pixels there are.
+            if np:
+                block = grid[:-1, :-1]
+                count = int(((block == grid[1:, :-1]) &
+                             (block == grid[:-1, 1:]) &
+                             (block == grid[1:, 1:])).sum())
+            else:
+                #With each row as an integer a pair of rows is checked at once
+                full = (1 << size) - 1
+                rows = [int(row.translate(_digit_table), 2) for row in rows]
+                count = 0
+                for upper, lower in zip(rows, rows[1:]):
+                    black = upper & lower
+                    white = ~upper & ~lower & full
+                    count += bin((black & (black >> 1)) |
+                                 (white & (white >> 1))).count('1')
+            score2 = count * 3
+
+            #Score penalty rule 3
+            #This rule looks for 1011101 within the mask prefixed
+            #and/or suffixed by four zeros.
+            score3 = len(_finder_re.findall(lines)) * 40
+
+            #Score the last rule, penalty rule 4. This rule measures how close
+            #the pattern is to being 50% black. The further it deviates from
+            #this this ideal the higher the penalty.
+            if np:
+                nblack = int(mask.sum())
+            else:
+                nblack = mask.count(b'\x01')
+
+            total_pixels = size**2
             ratio = nblack / total_pixels
             percent = (ratio * 100) - 50
-            self.scores[n][3] = int((abs(int(percent)) / 5) * 10)
+            score4 = int((abs(int(percent)) / 5) * 10)
 
+            self.scores.append([score1, score2, score3, score4])
 
         #Calculate the total for each score
-        totals = [0] * len(self.scores)
-        for i in range(len(self.scores)):
-            for j in range(len(self.scores[i])):
-                totals[i] +=  self.scores[i][j]
-
-        #DEBUG CODE!!!
-        #Prints out a table of scores
-        #print('Rule Scores\n      1     2     3     4    Total')
-        #for i in range(len(self.scores)):
-        #    print(i, end='')
-        #    for s in self.scores[i]:
-        #        print('{0: >6}'.format(s), end='')
-        #    print('{0: >7}'.format(totals[i]))
-        #print('Mask Chosen: {0}'.format(totals.index(min(totals))))
+        totals = [sum(scores) for scores in self.scores]
 
         #The lowest total wins
         return totals.index(min(totals))
@@ -0,0 +1,49 @@
+import time
+import threading
+
+
+# Lets playback loops sleep until their next deadline instead of re-checking Kodi state on a timer.
+# Window actions, player callbacks and the volume fader call wake() to end a wait early.
+#
+# Kodi only runs player and window callbacks on the thread that created them while that thread is
+# inside one of Kodi's own waits, and Monitor.waitForAbort() hands them over every 100ms. So with a
+# monitor the wait blocks in that one long-lived monitor and looks at the wake event each time Kodi
+# has run its callbacks. Without one (threads that own no Kodi objects) it blocks on the event alone.
+class Scheduler:
+    CALLBACK_INTERVAL = 0.1  # How often Monitor.waitForAbort() runs pending callbacks
+
+    def __init__(self, monitor=None, clock=time.time):
+        self.monitor = monitor
+        self.clock = clock
+        self._event = threading.Event()
+
+    def wake(self):
+        self._event.set()
+
+    # Returns True on abort, False at the deadline or when woken
+    def wait(self, deadline=None, max_wait=None):
+        if max_wait is not None:
+            limit = self.clock() + max_wait
+            deadline = limit if deadline is None else min(deadline, limit)
+
+        try:
+            while not self._event.isSet():
+                left = None
+                if deadline is not None:
+                    left = deadline - self.clock()
+                    if left <= 0:
+                        break
+
+                if self._block(left):
+                    return True
+        finally:
+            self._event.clear()
+
+        return False
+
+    def _block(self, left):
+        if not self.monitor:
+            self._event.wait(left)
+            return False
+
+        return self.monitor.waitForAbort(left is None and self.CALLBACK_INTERVAL or min(left, self.CALLBACK_INTERVAL))
@@ -6,8 +6,7 @@ import kodigui
 import kodiutil
 import cvutil
 import cinemavision
-
-from kodijsonrpc import rpc
+import libraryfacets
 
 cvutil.ratingParser()
 
@@ -309,35 +308,19 @@ class SeqAttrEditorDialog(kodigui.BaseDialog):
         return [hour, minute]
 
     def getGenreList(self, remove):
-        return [g.get('title') for g in rpc.VideoLibrary.GetGenres(
-            type='movie',
-            properties=['title']
-        ).get('genres', []) if g.get('title') and (not remove or not g.get('title') in remove)]
+        return libraryfacets.getFacets().values('genre', remove)
 
     def getTagList(self, remove):
-        kodiutil.LOG(repr(remove))
-        return [t.get('title') for t in rpc.VideoLibrary.GetTags(
-            type='movie',
-            properties=['title']
-        ).get('tags', []) if t.get('title') and (not remove or not t.get('title') in remove)]
+        return libraryfacets.getFacets().values('tag', remove)
 
     def getStudioList(self, remove):
-        # TODO: Get all studios?
-        movies = rpc.VideoLibrary.GetMovies(properties=['studio'], limits={'start': 0, 'end': 100000}).get('movies', [])
-        movies = [m for m in movies if not remove or not m in remove]
-        return sorted(list(set([y for z in movies for y in z['studio']])))
+        return libraryfacets.getFacets().values('studio', remove)
 
     def getDirectorList(self, remove):
-        # TODO: Get all directors?
-        movies = rpc.VideoLibrary.GetMovies(properties=['director'], limits={'start': 0, 'end': 100000}).get('movies', [])
-        movies = [m for m in movies if not remove or not m in remove]
-        return sorted(list(set([y for z in movies for y in z['director']])))
+        return libraryfacets.getFacets().values('director', remove)
 
     def getActorList(self, remove):
-        # TODO: Get all directors?
-        movies = rpc.VideoLibrary.GetMovies(properties=['cast'], limits={'start': 0, 'end': 100000}).get('movies', [])
-        movies = [m for m in movies if not remove or not m in remove]
-        return sorted(list(set([y['name'] for z in movies for y in z['cast']])))
+        return libraryfacets.getFacets().values('actor', remove)
 
     def getDBEntry(self, func, itype, disp, ret=None):
         allitems = func(ret)
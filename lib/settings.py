@@ -5,6 +5,8 @@ from kodiutil import T
 def clearDBWatchedStatus():
     from cinemavision import database as DB
 
+    DB.initialize()
+
     rows = DB.Trailers.update(watched=False).where(
         DB.Trailers.watched == 1
     ).execute()
@@ -16,6 +18,8 @@ def clearDBWatchedStatus():
 def clearDBBrokenStatus():
     from cinemavision import database as DB
 
+    DB.initialize()
+
     rows = DB.Trailers.update(broken=False).where(
         DB.Trailers.broken == 1
     ).execute()
@@ -177,6 +181,23 @@ def removeContentDatabase():
     xbmcgui.Dialog().ok(T(32515, 'Done'), ' ', T(32584, 'Database reset.'))
 
 
+def maintainDatabase():
+    from cinemavision import database as DB
+
+    DB.initialize()
+
+    with kodiutil.Progress(T(32122, 'Database maintenance')) as p:
+        lines = DB.maintenanceReport(DB.maintain(p.msg))
+
+    kodiutil.LOG('Database maintenance:\n    ' + '\n    '.join(lines))
+
+    import xbmcgui
+    if hasattr(xbmcgui.Dialog, 'textviewer'):
+        xbmcgui.Dialog().textviewer(T(32122, 'Database maintenance'), '[CR]'.join(lines))
+    else:
+        xbmcgui.Dialog().ok(T(32515, 'Done'), ' ', T(32122, 'Database maintenance'))
+
+
 def setDefaultSequence(setting):
     import cvutil
 
@@ -236,3 +257,59 @@ def testEventActions(action):
 def installContextMenu():
     import xbmc
     xbmc.executebuiltin('PlayMedia(plugin://context.cinemavision)')
+
+
+def profileStartup():
+    import sys
+    import time
+
+    timings = []
+
+    # Kodi may run this in an interpreter that has already done a step, which would then look free
+    def timed(label, func, done=False):
+        if done:
+            timings.append((label, None))
+            return
+
+        start = time.time()
+        func()
+        timings.append((label, (time.time() - start) * 1000))
+
+    def importCinemavision():
+        import cinemavision  # noqa F401
+
+    def importCVUtil():
+        import cvutil  # noqa F401
+
+    def initDB():
+        from cinemavision import database as DB
+        DB.initialize()
+
+    def loadRatings():
+        from cinemavision import ratings
+        ratings.ensureLoaded()
+
+    def importExperience():
+        import experience  # noqa F401
+
+    timed('import cinemavision', importCinemavision, 'cinemavision' in sys.modules)
+    timed('import cvutil', importCVUtil, 'cvutil' in sys.modules)
+
+    from cinemavision import database as DB
+    from cinemavision import ratings
+
+    timed('database initialize', initDB, bool(DB.DB))
+    timed('database initialize (again)', initDB)
+    timed('load rating systems', loadRatings, ratings.isLoaded())
+    timed('import experience', importExperience, 'experience' in sys.modules)
+
+    lines = [ms is None and '{0}: already done, not timed'.format(label) or '{0}: {1:.1f}ms'.format(label, ms) for label, ms in timings]
+    lines.append('TOTAL: {0:.1f}ms'.format(sum(t[1] for t in timings if t[1] is not None)))
+
+    kodiutil.LOG('Startup profile:\n    ' + '\n    '.join(lines))
+
+    import xbmcgui
+    if hasattr(xbmcgui.Dialog, 'textviewer'):
+        xbmcgui.Dialog().textviewer(T(32120, 'Profile startup'), '[CR]'.join(lines))
+    else:
+        xbmcgui.Dialog().ok(T(32120, 'Profile startup'), lines[-1])
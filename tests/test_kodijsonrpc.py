@@ -0,0 +1,144 @@
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lib'))
+
+import kodijsonrpc  # noqa E402
+
+
+# Stands in for xbmc.executeJSONRPC. Responses are looked up by method name and can be a value or a
+# function taking the params. Every request sent is kept in self.requests.
+class FakeTransport:
+    def __init__(self, responses=None):
+        self.responses = responses or {}
+        self.requests = []
+
+    def __call__(self, data):
+        request = json.loads(data)
+        self.requests.append(request)
+        if isinstance(request, list):
+            return json.dumps([self._response(r) for r in request])
+        return json.dumps(self._response(request))
+
+    def _response(self, request):
+        method = request['method']
+        ret = {'jsonrpc': '2.0', 'id': request.get('id')}
+        if method not in self.responses:
+            ret['error'] = {'code': -32601, 'message': 'Method not found.'}
+            return ret
+
+        response = self.responses[method]
+        if callable(response):
+            response = response(request.get('params', {}))
+        ret['result'] = response
+        return ret
+
+
+def movieDetails(params):
+    return {'moviedetails': {'movieid': params['movieid']}}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class KodiJSONRPCTest(unittest.TestCase):
+    def setUp(self):
+        self.transport = FakeTransport({
+            'VideoLibrary.GetMovieDetails': movieDetails,
+            'VideoLibrary.SetMovieDetails': 'OK',
+            'Player.GetActivePlayers': []
+        })
+        self.rpc = kodijsonrpc.KodiJSONRPC(self.transport)
+        self.clock = FakeClock()
+        self._time = kodijsonrpc.time.time
+        kodijsonrpc.time.time = self.clock
+
+    def tearDown(self):
+        kodijsonrpc.time.time = self._time
+
+    def test_call(self):
+        self.assertEqual(self.rpc.VideoLibrary.GetMovieDetails(movieid=3), {'moviedetails': {'movieid': 3}})
+        self.assertEqual(self.transport.requests[0]['params'], {'movieid': 3})
+
+    def test_call_error(self):
+        self.assertRaises(kodijsonrpc.JSONRPCMethod.Exception, self.rpc.VideoLibrary.Missing)
+
+    def test_batch_is_one_request(self):
+        with self.rpc.batch() as batch:
+            calls = [batch.VideoLibrary.GetMovieDetails(movieid=i) for i in range(3)]
+            missing = batch.VideoLibrary.Missing()
+
+        self.assertEqual(len(self.transport.requests), 1)
+        self.assertEqual(len(self.transport.requests[0]), 4)
+        self.assertEqual([c.result()['moviedetails']['movieid'] for c in calls], [0, 1, 2])
+        self.assertRaises(kodijsonrpc.JSONRPCMethod.Exception, missing.result)
+
+    def test_batch_result_before_execute(self):
+        batch = self.rpc.batch()
+        call = batch.VideoLibrary.GetMovieDetails(movieid=1)
+        self.assertRaises(kodijsonrpc.JSONRPCMethod.Exception, call.result)
+
+    def test_cache_disabled_by_default(self):
+        self.rpc.VideoLibrary.GetMovieDetails(movieid=1)
+        self.rpc.VideoLibrary.GetMovieDetails(movieid=1)
+        self.assertEqual(len(self.transport.requests), 2)
+
+    def test_cache_hits_until_ttl(self):
+        self.rpc.enableCache(60)
+        self.rpc.VideoLibrary.GetMovieDetails(movieid=1)
+        self.clock.now += 59
+        self.rpc.VideoLibrary.GetMovieDetails(movieid=1)
+        self.assertEqual(len(self.transport.requests), 1)
+
+        self.clock.now += 2
+        self.rpc.VideoLibrary.GetMovieDetails(movieid=1)
+        self.assertEqual(len(self.transport.requests), 2)
+
+    def test_cache_only_read_methods(self):
+        self.rpc.enableCache(60)
+        self.rpc.Player.GetActivePlayers()
+        self.rpc.Player.GetActivePlayers()
+        self.assertEqual(len(self.transport.requests), 2)
+
+    def test_cache_cleared_by_family_write(self):
+        self.rpc.enableCache(60)
+        self.rpc.VideoLibrary.GetMovieDetails(movieid=1)
+        self.rpc.VideoLibrary.SetMovieDetails(movieid=1, playcount=1)
+        self.rpc.VideoLibrary.GetMovieDetails(movieid=1)
+        self.assertEqual(len(self.transport.requests), 3)
+
+    def test_cached_result_is_a_copy(self):
+        self.rpc.enableCache(60)
+        self.rpc.VideoLibrary.GetMovieDetails(movieid=1)['moviedetails']['movieid'] = 99
+        self.assertEqual(self.rpc.VideoLibrary.GetMovieDetails(movieid=1)['moviedetails']['movieid'], 1)
+
+    def test_batch_uses_and_fills_cache(self):
+        self.rpc.enableCache(60)
+        self.rpc.VideoLibrary.GetMovieDetails(movieid=1)
+        with self.rpc.batch() as batch:
+            calls = [batch.VideoLibrary.GetMovieDetails(movieid=i) for i in (1, 2)]
+
+        self.assertEqual(len(self.transport.requests[1]), 1)  # Only movie 2 was sent
+        self.assertEqual([c.result()['moviedetails']['movieid'] for c in calls], [1, 2])
+
+        self.rpc.VideoLibrary.GetMovieDetails(movieid=2)
+        self.assertEqual(len(self.transport.requests), 2)
+
+    def test_disabling_cache_clears_it(self):
+        self.rpc.enableCache(60)
+        self.rpc.VideoLibrary.GetMovieDetails(movieid=1)
+        self.rpc.enableCache(0)
+        self.rpc.enableCache(60)
+        self.rpc.VideoLibrary.GetMovieDetails(movieid=1)
+        self.assertEqual(len(self.transport.requests), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'lib'))
+sys.path.insert(0, os.path.join(ROOT, 'lib', 'cinemavision', 'included_packages'))
+
+from cinemavision import util  # noqa E402
+from cinemavision import ratings  # noqa E402
+
+
+class CombinedRegexTest(unittest.TestCase):
+    def test_earliest_match_wins(self):
+        regex = ratings.CombinedRegex({'A': r'(?P<rating>X)', 'B': r'(?i)(?P<rating>y)'})
+        self.assertEqual(regex.search('Y then X'), ('B', 'Y'))
+
+    def test_ties_follow_priority(self):
+        patterns = {'A': r'(?P<rating>PG)', 'B': r'(?P<rating>PG-13)'}
+        self.assertEqual(ratings.CombinedRegex(patterns, ('B', 'A')).search('PG-13'), ('B', 'PG-13'))
+        self.assertEqual(ratings.CombinedRegex(patterns, ('A', 'B')).search('PG-13'), ('A', 'PG'))
+
+    def test_ties_outside_priority_go_by_name(self):
+        patterns = {'B': r'(?P<rating>PG)', 'A': r'(?P<rating>PG-13)'}
+        self.assertEqual(ratings.CombinedRegex(patterns).search('PG-13'), ('A', 'PG-13'))
+
+    def test_no_match(self):
+        self.assertEqual(ratings.CombinedRegex({'A': r'(?P<rating>X)'}).search('Y'), (None, None))
+
+
+# The expressions are checked with the shipped rating systems loaded, as their patterns are combined
+# with the built in ones and could take ratings other systems share a prefix with
+class ParseRegExsTest(unittest.TestCase):
+    RATING_CHECKS = (
+        ('PG-13', 'MPAA', 'PG-13'),
+        ('NC-17', 'MPAA', 'NC-17'),
+        ('UNRATED', 'MPAA', 'UNRATED'),
+        ('PG', 'MPAA', 'PG')
+    )
+
+    SYSTEM_CHECKS = (
+        ('UK:15', 'BBFC', '15'),
+        ('UK 12A', 'BBFC', '12A'),
+        ('FSK 16', 'FSK', '16'),
+        ('Germany:12', 'FSK', '12'),
+        ('14 Anos', 'DEJUS', '14 Anos')
+    )
+
+    @classmethod
+    def setUpClass(cls):
+        cls.storage = util.STORAGE_PATH
+        util.STORAGE_PATH = tempfile.mkdtemp()
+        ratings.load()
+        cls.systemRE, cls.ratingRE, cls.ratingREs = ratings.getParseRegExs()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(util.STORAGE_PATH)
+        util.STORAGE_PATH = cls.storage
+
+    def test_ratings(self):
+        for text, system, rating in self.RATING_CHECKS:
+            self.assertEqual(self.ratingRE.search(text), (system, rating), text)
+
+    def test_system_ratings(self):
+        for text, system, rating in self.SYSTEM_CHECKS:
+            self.assertEqual(self.systemRE.search(text), (system, rating), text)
+
+    def test_builtin_systems_are_included(self):
+        for system in ratings.PARSE_PRIORITY:
+            self.assertIn(system, self.ratingREs)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lib'))
+
+from scheduler import Scheduler  # noqa E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+# Stands in for xbmc.Monitor: advances the fake clock instead of sleeping and runs any
+# callbacks that are due, the way Kodi runs player and window callbacks inside waitForAbort()
+class FakeMonitor:
+    def __init__(self, clock):
+        self.clock = clock
+        self.calls = []
+        self.callbacks = []
+        self.abortAt = None
+
+    def at(self, when, callback):
+        self.callbacks.append((when, callback))
+
+    def waitForAbort(self, timeout):
+        self.calls.append(timeout)
+        self.clock.now += timeout
+        for when, callback in list(self.callbacks):
+            if when <= self.clock.now:
+                self.callbacks.remove((when, callback))
+                callback()
+
+        return self.abortAt is not None and self.clock.now >= self.abortAt
+
+
+class SchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.monitor = FakeMonitor(self.clock)
+        self.scheduler = Scheduler(self.monitor, clock=self.clock)
+
+    def test_waits_until_deadline(self):
+        self.assertFalse(self.scheduler.wait(self.clock.now + 1))
+        self.assertAlmostEqual(self.clock.now, 1001.0)
+        self.assertTrue(all(t <= Scheduler.CALLBACK_INTERVAL for t in self.monitor.calls))
+
+    def test_past_deadline_does_not_block(self):
+        self.assertFalse(self.scheduler.wait(self.clock.now - 1))
+        self.assertEqual(self.monitor.calls, [])
+
+    def test_max_wait_caps_deadline(self):
+        self.scheduler.wait(self.clock.now + 10, max_wait=0.5)
+        self.assertAlmostEqual(self.clock.now, 1000.5)
+
+    def test_callback_wake_ends_wait(self):
+        self.monitor.at(1000.25, self.scheduler.wake)
+        self.assertFalse(self.scheduler.wait(self.clock.now + 10))
+        self.assertAlmostEqual(self.clock.now, 1000.3)
+
+    def test_wake_before_wait_returns_at_once(self):
+        self.scheduler.wake()
+        self.assertFalse(self.scheduler.wait(self.clock.now + 10))
+        self.assertEqual(self.monitor.calls, [])
+
+    def test_wake_is_consumed(self):
+        self.scheduler.wake()
+        self.scheduler.wait(self.clock.now + 10)
+        self.scheduler.wait(self.clock.now + 1)
+        self.assertAlmostEqual(self.clock.now, 1001.0)
+
+    def test_abort(self):
+        self.monitor.abortAt = 1000.15
+        self.assertTrue(self.scheduler.wait())
+        self.assertAlmostEqual(self.clock.now, 1000.2)
+
+    def test_without_monitor_blocks_on_event(self):
+        scheduler = Scheduler()
+        timer = threading.Timer(0.05, scheduler.wake)
+        timer.start()
+        start = time.time()
+        try:
+            self.assertFalse(scheduler.wait(max_wait=5))
+        finally:
+            timer.cancel()
+        self.assertLess(time.time() - start, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+# Times the per row content and watched lookups outside Kodi: peewee building a query for every
+# Model.get() against the SQL database.py compiles once (songExists, getTrivia, triviaWatched, ...).
+# Half of the lookups are misses, as most are while loading new content.
+#
+#   python tools/bench_dblookups.py [rows]
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'lib'))
+sys.path.insert(0, os.path.join(ROOT, 'lib', 'cinemavision', 'included_packages'))
+
+from cinemavision import util  # noqa E402
+from cinemavision import database as DB  # noqa E402
+
+
+def populate(rows):
+    with DB.DB.atomic():
+        for i in range(rows):
+            DB.Song.create(name='song{0}'.format(i), path='/music/song{0}.mp3'.format(i))
+            DB.Trivia.create(name='trivia{0}'.format(i), type='QA', TID='trivia{0}'.format(i), answerPath='/trivia/a{0}.jpg'.format(i))
+
+    with DB.W_DB.atomic():
+        for i in range(rows):
+            DB.Trailers.create(WID='trailer{0}'.format(i), source='bench', title='Trailer {0}'.format(i))
+            DB.WatchedTrivia.create(WID='trivia{0}'.format(i), watched=i % 2 == 0)
+
+
+def peeweeGet(model, where):
+    try:
+        return model.get(where)
+    except DB.peewee.DoesNotExist:
+        return None
+
+
+def peeweeLookups(keys):
+    for i in keys:
+        peeweeGet(DB.Song, DB.Song.path == '/music/song{0}.mp3'.format(i))
+        peeweeGet(DB.Trivia, DB.Trivia.answerPath == '/trivia/a{0}.jpg'.format(i))
+        peeweeGet(DB.Trivia, DB.Trivia.TID == 'trivia{0}'.format(i))
+        peeweeGet(DB.WatchedTrivia, (DB.WatchedTrivia.WID == 'trivia{0}'.format(i)) & DB.WatchedTrivia.watched)
+        peeweeGet(DB.Trailers, DB.Trailers.WID == 'trailer{0}'.format(i))
+
+
+def cachedLookups(keys):
+    for i in keys:
+        DB.songExists('/music/song{0}.mp3'.format(i))
+        DB.triviaExists('/trivia/a{0}.jpg'.format(i))
+        DB.getTrivia('trivia{0}'.format(i))
+        DB.triviaWatched('trivia{0}'.format(i))
+        DB.getTrailer('trailer{0}'.format(i))
+
+
+def check(keys):
+    for i in keys:
+        trivia = peeweeGet(DB.Trivia, DB.Trivia.TID == 'trivia{0}'.format(i))
+        cached = DB.getTrivia('trivia{0}'.format(i))
+        if (trivia and trivia.answerPath) != (cached and cached.answerPath):
+            print('Mismatch for trivia{0}'.format(i))
+
+
+def main():
+    rows = len(sys.argv) > 1 and int(sys.argv[1]) or 2000
+    DB.initialize()
+    populate(rows)
+
+    keys = range(0, rows * 2, 2)  # Only the first half exist, the rest are misses
+    check(keys)
+
+    print('{0} rows per table, {1} lookups:'.format(rows, len(keys) * 5))
+    for label, func in (('peewee Model.get()', peeweeLookups), ('cached SQL', cachedLookups)):
+        start = time.time()
+        func(keys)
+        print('  {0:<20} {1:.2f}s'.format(label, time.time() - start))
+
+
+if __name__ == '__main__':
+    util.STORAGE_PATH = tempfile.mkdtemp()
+    try:
+        main()
+    finally:
+        shutil.rmtree(util.STORAGE_PATH)
@@ -0,0 +1,66 @@
+# Times rating lookups outside Kodi: the old linear scan of a system's ratings, the per-system
+# name index (RatingSystem.getRatingByName) and the memoized ratings.getRating().
+#
+#   python tools/bench_ratings.py [iterations]
+import os
+import sys
+import shutil
+import tempfile
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'lib'))
+sys.path.insert(0, os.path.join(ROOT, 'lib', 'cinemavision', 'included_packages'))
+
+from cinemavision import util  # noqa E402
+from cinemavision import ratings  # noqa E402
+
+LOOKUPS = ('MPAA:PG-13', 'MPAA:NC-17', 'MPAA:R', 'FSK:16', 'BBFC:15', 'BBFC:12A', 'DEJUS:L', 'MPAA:G')
+
+
+def linearScan(system_name, name):
+    system = ratings.getRatingsSystem(system_name)
+    name = name.upper()
+    for r in system.ratings:
+        if r.name == name:
+            return r
+    return ratings.NO_RATING
+
+
+def indexed(system_name, name):
+    return ratings.getRatingsSystem(system_name).getRatingByName(name)
+
+
+def main():
+    iterations = len(sys.argv) > 1 and int(sys.argv[1]) or 20000
+    pairs = [l.split(':', 1) for l in LOOKUPS]
+
+    def runLinear():
+        for s, n in pairs:
+            linearScan(s, n)
+
+    def runIndexed():
+        for s, n in pairs:
+            indexed(s, n)
+
+    def runMemoized():
+        for l in LOOKUPS:
+            ratings.getRating(l)
+
+    for s, n in pairs:
+        if linearScan(s, n) is not indexed(s, n):
+            print('Mismatch for {0}:{1}'.format(s, n))
+
+    print('{0} lookups x {1}, per lookup:'.format(len(LOOKUPS), iterations))
+    for label, func in (('linear scan', runLinear), ('dict index', runIndexed), ('memoized', runMemoized)):
+        secs = min(timeit.repeat(func, number=iterations, repeat=3))
+        print('  {0:<12} {1:.2f}us'.format(label, secs / (iterations * len(LOOKUPS)) * 1000000))
+
+
+if __name__ == '__main__':
+    util.STORAGE_PATH = tempfile.mkdtemp()
+    try:
+        ratings.load()
+        main()
+    finally:
+        shutil.rmtree(util.STORAGE_PATH)